@@ -1,8 +1,13 @@
 from django.contrib import admin
-from .models import Game, Team, Round, PlayerStats
+from .models import Game, Team, Round, PlayerStats, RoundRequest, PlayerCareerStats, ShotEvent, GameSnapshot, PlayerPairStats
 
 
 admin.site.register(Game)
 admin.site.register(Team)
 admin.site.register(Round)
-admin.site.register(PlayerStats)
\ No newline at end of file
+admin.site.register(PlayerStats)
+admin.site.register(RoundRequest)
+admin.site.register(PlayerCareerStats)
+admin.site.register(ShotEvent)
+admin.site.register(GameSnapshot)
+admin.site.register(PlayerPairStats)
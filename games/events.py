@@ -0,0 +1,80 @@
+"""Live game events: round deltas published after commit and streamed to spectators."""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GameEventBackend(ABC):
+    """Interface for delivering game events to every subscriber of a game.
+
+    `publish` is called from request threads once a round has committed. `subscribe`
+    is an async context manager yielding an asyncio.Queue that receives the game's
+    events until the context exits. Only an in-process backend exists, so deployments run
+    a single worker; a backend relaying through a shared broker would be selected with the
+    GAME_EVENTS_BACKEND setting.
+    """
+
+    @abstractmethod
+    def publish(self, game_id, event):
+        pass
+
+    @abstractmethod
+    def subscribe(self, game_id):
+        pass
+
+
+class InProcessGameEventBackend(GameEventBackend):
+    """Delivers events to subscribers of this process only (single-node deployments)."""
+    MAX_QUEUED_EVENTS = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # game_id -> {(event loop, queue)}
+
+    def publish(self, game_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(game_id, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                continue  # The subscriber's event loop has already shut down
+
+    @staticmethod
+    def _deliver(queue, event):
+        # A spectator that stopped reading loses its oldest events rather than growing memory
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, game_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.MAX_QUEUED_EVENTS))
+        with self._lock:
+            self._subscribers.setdefault(game_id, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                game_subscribers = self._subscribers.get(game_id, set())
+                game_subscribers.discard(subscriber)
+                if not game_subscribers:
+                    self._subscribers.pop(game_id, None)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend configured by GAME_EVENTS_BACKEND."""
+    path = settings.GAME_EVENTS_BACKEND
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
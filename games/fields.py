@@ -0,0 +1,86 @@
+"""Compact storage for the 156-cup board: which cups were hit, and by whom."""
+import base64
+import struct
+
+from django.db import models
+
+TOTAL_CUPS = 156
+BITSET_BYTES = (TOTAL_CUPS + 7) // 8
+MAX_PLAYER_ID = 2 ** 32 - 1
+
+
+class CupState(dict):
+    """Cup number (as a string, like the API has always used) -> shooter player id.
+
+    Behaves like the JSON dict the API exposes, but is stored as a bitset of hit
+    cups followed by the shooter id of each hit cup in cup order.
+    """
+
+    @classmethod
+    def parse(cls, data, strict=True):
+        """Normalize a {cup_number: player_id} mapping, skipping cups that were not hit.
+
+        Raises ValueError on cup numbers or player ids that are not valid, unless
+        `strict` is False, in which case those entries are dropped.
+        """
+        cups = cls()
+        for cup, player_id in data.items():
+            if player_id in ("", None):
+                continue
+            try:
+                cup, player_id = int(cup), int(player_id)
+                if not 1 <= cup <= TOTAL_CUPS or not 0 < player_id <= MAX_PLAYER_ID:
+                    raise ValueError
+            except (TypeError, ValueError):
+                if strict:
+                    raise ValueError(f"Invalid cup entry {cup!r}: {player_id!r}")
+                continue
+            cups[str(cup)] = player_id
+        return cups
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        hits = int.from_bytes(data[:BITSET_BYTES], "little")
+        shooters = iter(struct.unpack(f"<{(len(data) - BITSET_BYTES) // 4}I", data[BITSET_BYTES:]))
+
+        cups = cls()
+        while hits:
+            lowest = hits & -hits
+            cups[str(lowest.bit_length())] = next(shooters)  # Bit n-1 marks cup n
+            hits ^= lowest
+        return cups
+
+    def to_bytes(self):
+        cups = self if type(self) is CupState else CupState.parse(self)
+        hits = 0
+        for cup in cups:
+            hits |= 1 << (int(cup) - 1)
+        shooters = [cups[cup] for cup in sorted(cups, key=int)]
+        return hits.to_bytes(BITSET_BYTES, "little") + struct.pack(f"<{len(shooters)}I", *shooters)
+
+
+class CupStateField(models.BinaryField):
+    """Stores a CupState as a hit bitset plus shooter ids (20 + 4 bytes per hit cup)."""
+    description = "Cup hits as a bitset plus shooter ids"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return CupState.from_bytes(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, CupState):
+            return value
+        if isinstance(value, dict):
+            return CupState.parse(value)
+        return CupState.from_bytes(super().to_python(value))
+
+    def get_prep_value(self, value):
+        if isinstance(value, dict):
+            value = CupState.to_bytes(value)
+        return super().get_prep_value(value)
+
+    def value_to_string(self, obj):
+        """Binary data is serialized as base64 string."""
+        return base64.b64encode(self.get_prep_value(self.value_from_object(obj))).decode("ascii")
@@ -0,0 +1,217 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from users.models import User
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+class Recorder:
+    """Collects latency, status and query count samples per endpoint across worker threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, seconds, status_code, query_count):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if query_count is not None:
+                self.queries[endpoint].append(query_count)
+            if status_code >= 400:
+                self.errors[endpoint] += 1
+
+
+class InProcessTransport:
+    """Sends requests through Django's full handler stack in this process, counting DB queries."""
+    counts_queries = True
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, payload=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            # Server errors (e.g. SQLite lock timeouts under load) are recorded, not raised
+            client = self.local.client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+
+        executed = []
+
+        def count_query(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            if method == "GET":
+                response = client.get(path)
+            else:
+                response = client.post(path, payload, content_type="application/json")
+        body = response.json() if response.get("Content-Type") == "application/json" else None
+        return response.status_code, body, len(executed)
+
+
+class HttpTransport:
+    """Sends requests to a running server; query counts are not visible from outside."""
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"null"), None
+        except urllib.error.HTTPError as error:
+            return error.code, None, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent games against the game API (start-game, game/<id>/round and game/<id> polls) "
+        "and report throughput, latency percentiles and DB queries per request for each endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=10, help="Number of simulated games.")
+        parser.add_argument("--team-size", type=int, default=6, choices=[3, 4, 5, 6])
+        parser.add_argument("--rounds", type=int, default=20, help="Rounds posted per game (at most 38).")
+        parser.add_argument("--polls", type=int, default=3, help="Spectator polls of game/<id> after each round.")
+        parser.add_argument(
+            "--workers", type=int, default=8,
+            help="Concurrent worker threads (in-process runs on SQLite use one, so use Postgres to measure concurrency).",
+        )
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable runs.")
+        parser.add_argument(
+            "--url", default=None,
+            help="Base URL of a running server (e.g. http://localhost:8000). Defaults to in-process requests.",
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options["rounds"] <= 38:
+            raise CommandError("--rounds must be between 1 and 38 so no game runs out of cups.")
+
+        if connection.vendor == "sqlite" and not options["url"] and options["workers"] > 1:
+            # Concurrent SQLite writers fail with "database is locked", which would be reported as API errors
+            self.stderr.write("SQLite serializes writes, running with a single worker; use Postgres to measure concurrency.")
+            options["workers"] = 1
+
+        rng = random.Random(options["seed"])
+        transport = HttpTransport(options["url"]) if options["url"] else InProcessTransport()
+        recorder = Recorder()
+
+        players = self.seed_players(options["games"] * options["team_size"] * 2)
+        self.stdout.write(f"Seeded {len(players)} benchmark players.")
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                rosters = [
+                    players[index:index + options["team_size"] * 2]
+                    for index in range(0, len(players), options["team_size"] * 2)
+                ]
+                seeds = [rng.random() for _ in rosters]
+                jobs = [
+                    pool.submit(self.play_game, transport, recorder, roster, options, seed)
+                    for roster, seed in zip(rosters, seeds)
+                ]
+                for job in jobs:
+                    job.result()
+            elapsed = time.perf_counter() - started
+        finally:
+            self.delete_players(players)
+
+        self.report(recorder, elapsed, transport.counts_queries)
+
+    def seed_players(self, count):
+        """Create throwaway users for this run, like users/generate_test_players.py but collision-free."""
+        run = uuid.uuid4().hex[:8]
+        User.objects.bulk_create([
+            User(username=f"bench-{run}-{index}", email=f"bench-{run}-{index}@example.com")
+            for index in range(count)
+        ])
+        return list(User.objects.filter(username__startswith=f"bench-{run}-").order_by("id").values_list("id", flat=True))
+
+    def delete_players(self, players):
+        """
+        Remove this run's users. Benchmark players only ever play each other, so deleting them
+        cascades to exactly the run's teams, games, rounds, stats and rollup rows.
+        """
+        User.objects.filter(pk__in=players).delete()
+        self.stdout.write(f"Deleted {len(players)} benchmark players and their games.")
+
+    def timed(self, transport, recorder, endpoint, method, path, payload=None):
+        started = time.perf_counter()
+        status_code, body, query_count = transport.request(method, path, payload)
+        recorder.add(endpoint, time.perf_counter() - started, status_code, query_count)
+        return status_code, body
+
+    def play_game(self, transport, recorder, roster, options, seed):
+        rng = random.Random(seed)
+        try:
+            team_size = options["team_size"]
+            teamA, teamB = roster[:team_size], roster[team_size:]
+            status_code, body = self.timed(transport, recorder, "new-game", "POST", reverse("new-game"), {
+                "game_settings": {"gamemode": "Casual", "teamsize": team_size},
+                "teams": {
+                    "team1": {"name": f"Bench A {seed:.6f}", "players": teamA},
+                    "team2": {"name": f"Bench B {seed:.6f}", "players": teamB},
+                },
+            })
+            if status_code != 201:
+                return
+
+            game_id = body["game_id"]
+            round_url = reverse("new-round", kwargs={"game_id": game_id})
+            state_url = reverse("game-state", kwargs={"game_id": game_id})
+            teamA_cups = list(range(1, 79))  # Hit by team B
+            teamB_cups = list(range(79, 157))  # Hit by team A
+            rng.shuffle(teamA_cups)
+            rng.shuffle(teamB_cups)
+
+            for _ in range(options["rounds"]):
+                cups = {}
+                for _ in range(rng.randint(0, 2)):
+                    cups[str(teamB_cups.pop())] = rng.choice(teamA)
+                for _ in range(rng.randint(1, 2)):
+                    cups[str(teamA_cups.pop())] = rng.choice(teamB)
+                self.timed(transport, recorder, "new-round", "POST", round_url, {"gamestate": {"cups": cups}})
+
+                for _ in range(options["polls"]):
+                    self.timed(transport, recorder, "game-state", "GET", state_url)
+        finally:
+            connection.close()
+
+    def report(self, recorder, elapsed, counts_queries):
+        self.stdout.write(f"\nWall time: {elapsed:.2f}s\n")
+        header = f"{'endpoint':<12} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for endpoint, latencies in sorted(recorder.latencies.items()):
+            latencies = sorted(latencies)
+            queries = recorder.queries.get(endpoint)
+            average_queries = f"{sum(queries) / len(queries):.1f}" if counts_queries and queries else "n/a"
+            self.stdout.write(
+                f"{endpoint:<12} {len(latencies):>8} {recorder.errors[endpoint]:>6} {len(latencies) / elapsed:>8.1f} "
+                f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.1f} {average_queries:>8}"
+            )
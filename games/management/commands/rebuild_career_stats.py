@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from games.models import PlayerCareerStats, PlayerModeStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PlayerCareerStats leaderboard rollup and PlayerModeStats splits from scratch out of PlayerStats."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = PlayerCareerStats.rebuild()
+            splits = PlayerModeStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt career stats for {count} players ({splits} gamemode splits)."))
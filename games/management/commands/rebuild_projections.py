@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from games.models import Game, PlayerStats, PlayerCareerStats, PlayerModeStats
+from games.projections import project_game
+from games.replay import STATS_COUNTERS
+from games.views import RoundIngestion
+
+GAME_FIELDS = ["cups", "teamA_cups_made", "teamB_cups_made", "teamA_cups_remaining", "teamB_cups_remaining"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every game's board and counters and its PlayerStats from the ShotEvent log, "
+        "then the career and gamemode rollups, repairing anything that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--game", type=int, default=None, help="Only rebuild this game.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report games whose projections drifted.")
+
+    def handle(self, *args, **options):
+        game_ids = Game.objects.order_by("id").values_list("id", flat=True)
+        if options["game"] is not None:
+            game_ids = game_ids.filter(pk=options["game"])
+
+        drifted = 0
+        for game_id in list(game_ids):
+            # Read and repair under the game's row lock, taken first as round ingestion does, so a
+            # round posted meanwhile is neither overwritten nor given a version number twice
+            with transaction.atomic():
+                try:
+                    game = RoundIngestion.lock_game(game_id)
+                except Game.DoesNotExist:
+                    continue  # Deleted since the ids were read
+                drift = self.repair(game, options["dry_run"])
+            if drift:
+                drifted += 1
+                self.stdout.write(f"Game {game_id}: {drift}")
+
+        if drifted and not options["dry_run"]:
+            with transaction.atomic():
+                PlayerCareerStats.rebuild()
+                PlayerModeStats.rebuild()
+
+        action = "found" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"{drifted} drifted games {action}."))
+
+    def repair(self, game, dry_run):
+        """Project a locked game from its ShotEvents and write back what drifted; describes the drift, if any."""
+        score_field = PlayerStats._meta.get_field("score")
+        stored_game = {field: getattr(game, field) for field in GAME_FIELDS}
+        stats_by_player = {stats.player_id: stats for stats in game.game_stats.all()}
+        stored_stats = {
+            player_id: {field: getattr(stats, field) for field in STATS_COUNTERS + ["score"]}
+            for player_id, stats in stats_by_player.items()
+        }
+
+        projected = project_game(game, game.shot_events.order_by("round_number", "id"))
+        for player_id, counters in projected.items():
+            stats = stats_by_player.get(player_id)
+            if stats is None:
+                continue  # Created by the game's first round
+            for field, value in counters.items():
+                setattr(stats, field, value)
+            # Quantized like the stored value so unchanged scores compare equal
+            stats.score = score_field.to_python(stats.calculate_score())
+
+        game_drift = {field for field in GAME_FIELDS if getattr(game, field) != stored_game[field]}
+        stale_stats = [
+            stats for player_id, stats in stats_by_player.items()
+            if any(getattr(stats, field) != value for field, value in stored_stats[player_id].items())
+        ]
+        if not game_drift and not stale_stats:
+            return None
+
+        if not dry_run:
+            if game_drift:
+                game.save()
+            else:
+                # Repaired scores change the game state too, so cached copies must go stale
+                Game.objects.filter(pk=game.pk).update(version=F("version") + 1)
+            PlayerStats.objects.bulk_update(stale_stats, STATS_COUNTERS + ["score"])
+        return f"{', '.join(sorted(game_drift)) or 'counters ok'}, {len(stale_stats)} player stats rows drifted"
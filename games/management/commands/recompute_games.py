@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from games.models import Game
+
+COUNTER_FIELDS = ["teamA_cups_made", "teamB_cups_made", "teamA_cups_remaining", "teamB_cups_remaining"]
+
+
+class Command(BaseCommand):
+    help = "Recount every game's team counters from its board and repair any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report games whose counters drifted.")
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for game in Game.objects.iterator(chunk_size=500):
+            stored = {field: getattr(game, field) for field in COUNTER_FIELDS}
+            game.recompute()
+            recounted = {field: getattr(game, field) for field in COUNTER_FIELDS}
+            if stored == recounted:
+                continue
+
+            drifted += 1
+            self.stdout.write(f"Game {game.pk}: stored {stored}, recounted {recounted}")
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    # Recount the locked row, so a round committed since the scan is not written over
+                    game = Game.objects.select_for_update().get(pk=game.pk)
+                    game.recompute()
+                    game.save()
+
+        action = "found" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"{drifted} drifted games {action}."))
@@ -0,0 +1,97 @@
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from games.models import Game, PlayerStats, PlayerCareerStats, PlayerModeStats
+from games.rating import rate, team_cups
+
+TEAM_A_SLOTS = [f"game__team1__player{slot}" for slot in range(1, 7)]
+COLUMNS = [
+    "id", "game_id", "player_id", "cups_made", "clutch_cups", "death_cups", "own_cups", "score",
+    "game__teamA_cups_made", "game__teamB_cups_made", *TEAM_A_SLOTS,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-rate every PlayerStats row with the current weights, in chunks computed with NumPy, "
+        "then rebuild the career and gamemode rollups from the new scores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Rows read, rated and written per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows whose score would change.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        started = time.perf_counter()
+        last_id = 0
+        rated = changed = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    PlayerStats.objects.filter(id__gt=last_id).order_by("id").values_list("id", "game_id")[:chunk_size]
+                )
+                if not chunk:
+                    break
+
+                # Lock the chunk's games before their stats rows, in the same order as round ingestion,
+                # so a round landing mid-run neither deadlocks with the chunk nor gets a stale score
+                game_ids = {game_id for _, game_id in chunk}
+                list(Game.objects.select_for_update().filter(pk__in=game_ids).order_by("pk").values_list("pk", flat=True))
+                rows = list(
+                    PlayerStats.objects.filter(id__gt=last_id, id__lte=chunk[-1][0]).order_by("id")
+                    .select_for_update(of=("self",))
+                    .values_list(*COLUMNS)
+                )
+                last_id = chunk[-1][0]
+                if not rows:
+                    continue  # Deleted since the chunk was read
+                rated += len(rows)
+
+                updates = self.rate_chunk(rows)
+                changed += len(updates)
+                if updates and not options["dry_run"]:
+                    PlayerStats.objects.bulk_update(updates, ["score"], batch_size=1000)
+                    # New version so game-state ETags and cache entries holding the old scores go stale
+                    Game.objects.filter(pk__in={stats.game_id for stats in updates}).update(version=F("version") + 1)
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{changed} of {rated} scores would change."))
+            return
+
+        if changed:
+            with transaction.atomic():
+                PlayerCareerStats.rebuild()
+                PlayerModeStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-rated {rated} rows in {time.perf_counter() - started:.1f}s, {changed} scores changed."
+        ))
+
+    def rate_chunk(self, rows):
+        """Unsaved PlayerStats carrying the new score, for the rows whose score changed."""
+        columns = list(zip(*rows))
+        ids, game_ids, player_ids, cups_made, clutch_cups, death_cups, own_cups, scores, teamA_made, teamB_made = columns[:10]
+        slots = np.array(
+            [[-1 if player_id is None else player_id for player_id in slot] for slot in columns[10:]], dtype=np.int64
+        ).T
+
+        sides = team_cups(
+            np.array(player_ids, dtype=np.int64), slots,
+            np.array(teamA_made, dtype=np.int64), np.array(teamB_made, dtype=np.int64),
+        )
+        new_scores = rate(cups_made, sides, clutch_cups, death_cups, own_cups)
+
+        # Compare at the stored precision; the DecimalField quantizes the float the same way on save
+        field = PlayerStats._meta.get_field("score")
+        return [
+            PlayerStats(id=pk, game_id=game_id, score=score)
+            for pk, game_id, old, score in zip(ids, game_ids, scores, new_scores)
+            if Decimal(old) != field.to_python(score)
+        ]
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from games.models import Game
+from games.replay import STATS_COUNTERS, replay
+
+GAME_FIELDS = ["cups", "teamA_cups_made", "teamB_cups_made", "teamA_cups_remaining", "teamB_cups_remaining"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every game from its rounds and report where the live board, team counters, "
+        "PlayerStats or latest snapshot disagree with the replay. Nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--game", type=int, default=None, help="Only verify this game.")
+
+    def handle(self, *args, **options):
+        games = Game.objects.select_related("team1", "team2").prefetch_related("game_stats").order_by("id")
+        if options["game"] is not None:
+            games = games.filter(pk=options["game"])
+
+        checked = drifted = 0
+        for game in games.iterator(chunk_size=200):
+            checked += 1
+            problems = self.diff(game)
+            if problems:
+                drifted += 1
+                self.stdout.write(f"Game {game.pk}: " + "; ".join(problems))
+
+        summary = f"{drifted} of {checked} games differ from their replay."
+        self.stdout.write(self.style.ERROR(summary) if drifted else self.style.SUCCESS(summary))
+
+    def diff(self, game):
+        """Descriptions of every value that differs between the live game and its replay."""
+        live_game = {field: getattr(game, field) for field in GAME_FIELDS}
+        live_stats = {
+            stats.player_id: {field: getattr(stats, field) for field in STATS_COUNTERS}
+            for stats in game.game_stats.all()
+        }
+
+        full = replay(game, use_snapshots=False)
+        from_snapshot = replay(game)
+        problems = []
+        if from_snapshot.stats != full.stats or from_snapshot.board != full.board:
+            problems.append("latest snapshot disagrees with a replay from round 1")
+
+        full.to_game(game)
+        for field in GAME_FIELDS:
+            if getattr(game, field) != live_game[field]:
+                detail = "board" if field == "cups" else f"{field} live {live_game[field]}, replayed {getattr(game, field)}"
+                problems.append(detail)
+
+        for player_id, counters in full.stats.items():
+            stored = live_stats.get(player_id)
+            if stored is None:
+                if full.round_number:
+                    problems.append(f"player {player_id} has no stats row")
+                continue
+            for field, value in counters.items():
+                if stored[field] != value:
+                    problems.append(f"player {player_id} {field} live {stored[field]}, replayed {value}")
+        return problems
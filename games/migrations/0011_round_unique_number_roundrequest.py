@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def renumber_duplicate_rounds(apps, schema_editor):
+    """Renumber rounds of games that recorded the same round number twice, in insertion order."""
+    Round = apps.get_model('games', 'Round')
+    duplicated_games = (
+        Round.objects.values('game').annotate(rounds=models.Count('id'), numbers=models.Count('round_number', distinct=True))
+        .filter(rounds__gt=models.F('numbers')).values_list('game', flat=True)
+    )
+    for game_id in duplicated_games:
+        rounds = list(Round.objects.filter(game_id=game_id).order_by('round_number', 'id'))
+        for number, game_round in enumerate(rounds, start=1):
+            game_round.round_number = number
+        Round.objects.bulk_update(rounds, ['round_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_alter_playerstats_unique_together_game_winner_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('status_code', models.IntegerField()),
+                ('response', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(renumber_duplicate_rounds, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='round',
+            constraint=models.UniqueConstraint(fields=('game', 'round_number'), name='unique_round_number_per_game'),
+        ),
+        migrations.AddField(
+            model_name='roundrequest',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='round_requests', to='games.game'),
+        ),
+        migrations.AddConstraint(
+            model_name='roundrequest',
+            constraint=models.UniqueConstraint(fields=('game', 'key'), name='unique_round_request_key'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:50
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_career_stats(apps, schema_editor):
+    """Seed the rollup from existing PlayerStats (same totals as `manage.py rebuild_career_stats`)."""
+    PlayerStats = apps.get_model('games', 'PlayerStats')
+    PlayerCareerStats = apps.get_model('games', 'PlayerCareerStats')
+    totals = PlayerStats.objects.values('player').annotate(
+        games_played=models.Count('id'),
+        total_cups_made=models.Sum('cups_made'),
+        total_death_cups=models.Sum('death_cups'),
+        accuracy_sum=models.Sum('accuracy'),
+        score_sum=models.Sum('score'),
+    )
+    careers = []
+    for entry in totals:
+        games_played = entry['games_played']
+        careers.append(PlayerCareerStats(
+            player_id=entry.pop('player'),
+            average_accuracy=entry['accuracy_sum'] / games_played,
+            average_rating=float(Decimal(entry['score_sum']) / games_played),
+            **entry,
+        ))
+    PlayerCareerStats.objects.bulk_create(careers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_game_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerCareerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games_played', models.IntegerField(default=0)),
+                ('total_cups_made', models.IntegerField(default=0)),
+                ('total_death_cups', models.IntegerField(default=0)),
+                ('accuracy_sum', models.FloatField(default=0.0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_accuracy', models.FloatField(default=0.0)),
+                ('average_rating', models.FloatField(default=0.0)),
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='career_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-average_rating', 'player'], name='career_rating_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_career_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0013_playercareerstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['created_at', 'id'], name='game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='game_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['gamemode', 'created_at', 'id'], name='game_mode_created_idx'),
+        ),
+    ]
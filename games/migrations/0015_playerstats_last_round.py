@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:52
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_round(apps, schema_editor):
+    """Treat every existing row as changed in its game's latest round."""
+    PlayerStats = apps.get_model('games', 'PlayerStats')
+    Round = apps.get_model('games', 'Round')
+    latest_round = (
+        Round.objects.filter(game=models.OuterRef('game')).order_by('-round_number').values('round_number')[:1]
+    )
+    PlayerStats.objects.update(last_round=Coalesce(models.Subquery(latest_round), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0014_game_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='last_round',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_last_round, migrations.RunPython.noop),
+    ]
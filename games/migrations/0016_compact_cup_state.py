@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:05
+
+import games.fields
+from django.db import migrations
+
+
+def pack_cups(apps, schema_editor):
+    """Copy each JSON cup dict into the packed column, dropping entries that were never hits."""
+    for model_name in ('Game', 'Round'):
+        model = apps.get_model('games', model_name)
+        rows = []
+        for row in model.objects.only('id', 'cups').iterator(chunk_size=1000):
+            row.cups_packed = games.fields.CupState.parse(row.cups or {}, strict=False)
+            rows.append(row)
+            if len(rows) == 1000:
+                model.objects.bulk_update(rows, ['cups_packed'])
+                rows = []
+        model.objects.bulk_update(rows, ['cups_packed'])
+
+
+def unpack_cups(apps, schema_editor):
+    for model_name in ('Game', 'Round'):
+        model = apps.get_model('games', model_name)
+        rows = []
+        for row in model.objects.only('id', 'cups_packed').iterator(chunk_size=1000):
+            row.cups = dict(row.cups_packed)
+            rows.append(row)
+        model.objects.bulk_update(rows, ['cups'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0015_playerstats_last_round'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='cups_packed',
+            field=games.fields.CupStateField(default=games.fields.CupState),
+        ),
+        migrations.AddField(
+            model_name='round',
+            name='cups_packed',
+            field=games.fields.CupStateField(default=games.fields.CupState),
+        ),
+        migrations.RunPython(pack_cups, unpack_cups),
+        migrations.RemoveField(
+            model_name='game',
+            name='cups',
+        ),
+        migrations.RemoveField(
+            model_name='round',
+            name='cups',
+        ),
+        migrations.RenameField(
+            model_name='game',
+            old_name='cups_packed',
+            new_name='cups',
+        ),
+        migrations.RenameField(
+            model_name='round',
+            old_name='cups_packed',
+            new_name='cups',
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:56
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_team_records(apps, schema_editor):
+    """Hash existing lineups and rebuild team records from completed games."""
+    Team = apps.get_model('games', 'Team')
+    Game = apps.get_model('games', 'Game')
+
+    teams = {}
+    for team in Team.objects.all():
+        slots = [team.player1_id, team.player2_id, team.player3_id, team.player4_id, team.player5_id, team.player6_id]
+        player_ids = sorted(player_id for player_id in slots if player_id is not None)
+        team.roster_hash = hashlib.sha1(",".join(str(player_id) for player_id in player_ids).encode()).hexdigest()
+        teams[team.pk] = team
+
+    for game in Game.objects.filter(status='Completed'):
+        # Games won by team 2 used to be saved without a winner
+        if game.winner_id is None and game.teamB_cups_remaining == 0:
+            game.winner_id = game.team2_id
+            game.save(update_fields=['winner'])
+
+        teamA_differential = game.teamA_cups_made - game.teamB_cups_made
+        for team_id, differential in ((game.team1_id, teamA_differential), (game.team2_id, -teamA_differential)):
+            team = teams[team_id]
+            if game.winner_id == team_id:
+                team.wins += 1
+            else:
+                team.losses += 1
+            team.cup_differential += differential
+
+    Team.objects.bulk_update(teams.values(), ['roster_hash', 'wins', 'losses', 'cup_differential'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0016_compact_cup_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='cup_differential',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='losses',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='roster_hash',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='wins',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_team_records, migrations.RunPython.noop),
+    ]
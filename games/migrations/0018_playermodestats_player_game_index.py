@@ -0,0 +1,69 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:02
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_mode_stats(apps, schema_editor):
+    """Seed the per-gamemode split from existing PlayerStats (same totals as `manage.py rebuild_career_stats`)."""
+    PlayerStats = apps.get_model('games', 'PlayerStats')
+    PlayerModeStats = apps.get_model('games', 'PlayerModeStats')
+    totals = PlayerStats.objects.values('player', gamemode=models.F('game__gamemode')).annotate(
+        games_played=models.Count('id'),
+        total_cups_made=models.Sum('cups_made'),
+        total_death_cups=models.Sum('death_cups'),
+        accuracy_sum=models.Sum('accuracy'),
+        score_sum=models.Sum('score'),
+    )
+    splits = []
+    for entry in totals:
+        games_played = entry['games_played']
+        splits.append(PlayerModeStats(
+            player_id=entry.pop('player'),
+            average_accuracy=entry['accuracy_sum'] / games_played,
+            average_rating=float(Decimal(entry['score_sum']) / games_played),
+            **entry,
+        ))
+    PlayerModeStats.objects.bulk_create(splits, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0017_team_roster_hash_and_record'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerModeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games_played', models.IntegerField(default=0)),
+                ('total_cups_made', models.IntegerField(default=0)),
+                ('total_death_cups', models.IntegerField(default=0)),
+                ('accuracy_sum', models.FloatField(default=0.0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_accuracy', models.FloatField(default=0.0)),
+                ('average_rating', models.FloatField(default=0.0)),
+                ('gamemode', models.CharField(choices=[('Casual', 'Casual'), ('Competitive', 'Competitive'), ('IFC', 'IFC')], max_length=20)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(fields=['player', 'game'], name='playerstats_player_game_idx'),
+        ),
+        migrations.AddField(
+            model_name='playermodestats',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mode_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='playermodestats',
+            constraint=models.UniqueConstraint(fields=('player', 'gamemode'), name='unique_player_gamemode'),
+        ),
+        migrations.RunPython(backfill_mode_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_shot_events(apps, schema_editor):
+    """
+    Log the shots of existing games from their Round boards. Rounds never recorded who hit a
+    death cup when, so each player's PlayerStats.death_cups are logged in the game's last round.
+    """
+    Game = apps.get_model('games', 'Game')
+    Round = apps.get_model('games', 'Round')
+    PlayerStats = apps.get_model('games', 'PlayerStats')
+    ShotEvent = apps.get_model('games', 'ShotEvent')
+
+    events = []
+    for game in Game.objects.select_related('team1', 'team2').iterator(chunk_size=500):
+        sides = {}
+        for team, side in ((game.team1, 'teamA'), (game.team2, 'teamB')):
+            for slot in range(1, 7):
+                player_id = getattr(team, f'player{slot}_id')
+                if player_id is not None:
+                    sides[player_id] = side
+
+        last_round = 0
+        for game_round in Round.objects.filter(game=game).order_by('round_number'):
+            last_round = game_round.round_number
+            hitters = {'teamA': [], 'teamB': []}
+            for cup, shooter_id in game_round.cups.items():
+                cup = int(cup)
+                side = sides.get(shooter_id)
+                event = ShotEvent(game=game, round_number=last_round, cup=cup, shooter_id=shooter_id, side=side or '')
+                if side is not None:
+                    scoring_side = 'teamB' if cup < 79 else 'teamA'
+                    if side == scoring_side:
+                        hitters[side].append(event)
+                    else:
+                        event.is_own_cup = True
+                events.append(event)
+            for side_hitters in hitters.values():
+                if len(side_hitters) == 1:
+                    side_hitters[0].is_clutch = True
+
+        for stats in PlayerStats.objects.filter(game=game, death_cups__gt=0):
+            events.extend(
+                ShotEvent(game=game, round_number=last_round, shooter_id=stats.player_id, side=sides.get(stats.player_id, ''), is_death=True)
+                for _ in range(stats.death_cups)
+            )
+
+        if len(events) >= 5000:
+            ShotEvent.objects.bulk_create(events)
+            events = []
+    ShotEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0018_playermodestats_player_game_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShotEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField()),
+                ('cup', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('side', models.CharField(blank=True, choices=[('teamA', 'teamA'), ('teamB', 'teamB'), ('', 'Not on roster')], max_length=5)),
+                ('is_clutch', models.BooleanField(default=False)),
+                ('is_death', models.BooleanField(default=False)),
+                ('is_own_cup', models.BooleanField(default=False)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shot_events', to='games.game')),
+                ('shooter', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='shot_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game', 'round_number'], name='shotevent_game_round_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_shot_events, migrations.RunPython.noop),
+    ]
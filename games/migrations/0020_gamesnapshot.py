@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:08
+
+import django.db.models.deletion
+import games.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0019_shotevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField()),
+                ('cups', games.fields.CupStateField(default=games.fields.CupState)),
+                ('stats', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='games.game')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('game', 'round_number'), name='unique_snapshot_round')],
+            },
+        ),
+    ]
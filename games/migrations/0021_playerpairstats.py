@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_pair_stats(apps, schema_editor):
+    """Seed head-to-head records from completed games (same deltas as PlayerPairStats.game_changes)."""
+    Game = apps.get_model('games', 'Game')
+    PlayerPairStats = apps.get_model('games', 'PlayerPairStats')
+
+    def slot_ids(team):
+        ids = (getattr(team, f'player{slot}_id') for slot in range(1, 7))
+        return {player_id for player_id in ids if player_id is not None}
+
+    records = {}
+    for game in Game.objects.filter(status='Completed').select_related('team1', 'team2').iterator(chunk_size=500):
+        teamA, teamB = slot_ids(game.team1), slot_ids(game.team2)
+        teamA_differential = game.teamA_cups_made - game.teamB_cups_made
+        for side, opponents, team_id, differential in (
+            (teamA, teamB, game.team1_id, teamA_differential),
+            (teamB, teamA, game.team2_id, -teamA_differential),
+        ):
+            won = int(game.winner_id == team_id)
+            pairs = [(other_id, 'teammate') for other_id in side] + [(other_id, 'opponent') for other_id in opponents]
+            for player_id in side:
+                for other_id, relation in pairs:
+                    if other_id == player_id:
+                        continue
+                    record = records.setdefault((player_id, other_id, relation), [0, 0, 0, 0])
+                    record[0] += 1
+                    record[1] += won
+                    record[2] += 1 - won
+                    record[3] += differential
+
+    PlayerPairStats.objects.bulk_create(
+        [
+            PlayerPairStats(
+                player_id=player_id, other_id=other_id, relation=relation,
+                games=games, wins=wins, losses=losses, cup_differential=cup_differential,
+            )
+            for (player_id, other_id, relation), (games, wins, losses, cup_differential) in records.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0020_gamesnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerPairStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relation', models.CharField(choices=[('teammate', 'Teammate'), ('opponent', 'Opponent')], max_length=10)),
+                ('games', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('cup_differential', models.IntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pair_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['player', 'relation', '-games', 'other'], name='pair_by_games_idx')],
+                'constraints': [models.UniqueConstraint(fields=('player', 'other', 'relation'), name='unique_player_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_pair_stats, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,34 @@
-from django.db import models
+import hashlib
+from decimal import Decimal
+from functools import cached_property
+from django.db import connection, models
 from users.models import User
+from .fields import CupState, CupStateField
+
+# **Rating weights** (PlayerStats.calculate_score and the batch engine in games/rating.py)
+W_PLAYER_IMPACT = 1.2   # Player's share of total cups made
+W_CLUTCH_CUPS = 0.15    # Clutch Cups bonus
+W_OWN_CUPS = 0.40       # Own Cups penalty (more severe now)
+
+class Roster:
+    """Player ids on each side of a game, for O(1) membership checks without loading users."""
+
+    def __init__(self, teamA_ids, teamB_ids):
+        self.teamA = frozenset(teamA_ids)
+        self.teamB = frozenset(teamB_ids)
+        self.sides = {player_id: "teamA" for player_id in self.teamA}
+        self.sides.update({player_id: "teamB" for player_id in self.teamB})
+
+    @property
+    def player_ids(self):
+        return self.teamA | self.teamB
+
+    def side_of(self, player_id):
+        """Return "teamA", "teamB" or None if the player is not in this game."""
+        return self.sides.get(player_id)
+
+    def __contains__(self, player_id):
+        return player_id in self.sides
 
 class Team(models.Model):
     team_name = models.CharField(max_length=100, unique=False)
@@ -10,6 +39,30 @@ class Team(models.Model):
     player5 = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="team_player5")
     player6 = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="team_player6")
 
+    # Canonical lineup identity, so recurring lineups reuse one Team row
+    roster_hash = models.CharField(max_length=40, db_index=True, editable=False, default="")
+
+    # Team Record (updated when one of its games is completed)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    cup_differential = models.IntegerField(default=0)
+
+    @property
+    def player_ids(self):
+        """Ids of the filled player slots, read from the FK columns without loading any user."""
+        slots = [self.player1_id, self.player2_id, self.player3_id, self.player4_id, self.player5_id, self.player6_id]
+        return [player_id for player_id in slots if player_id is not None]
+
+    @staticmethod
+    def hash_roster(player_ids):
+        """Order-independent hash of a lineup's player ids."""
+        return hashlib.sha1(",".join(str(player_id) for player_id in sorted(player_ids)).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        """Override save to keep the roster hash in sync with the player slots."""
+        self.roster_hash = self.hash_roster(self.player_ids)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.team_name
     
@@ -48,12 +101,28 @@ class Game(models.Model):
     teamB_cups_remaining = models.IntegerField(default=78)
     
     # Game State
-    cups = models.JSONField(default=dict)
+    cups = CupStateField(default=CupState)
     winner = models.ForeignKey(Team, on_delete=models.SET_NULL, null=True, blank=True, related_name="game_winner")
 
+    # Bumped on every save, used for ETags and to key cached game states
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Back the cursor-paginated game list, alone and filtered by status or gamemode
+            models.Index(fields=["created_at", "id"], name="game_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="game_status_created_idx"),
+            models.Index(fields=["gamemode", "created_at", "id"], name="game_mode_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.team1} vs {self.team2} | {self.status}"
     
+    @cached_property
+    def roster(self):
+        """Player ids per side, built once per game instance."""
+        return Roster(self.team1.player_ids, self.team2.player_ids)
+
     def determine_rack_status(self, remaining_cups):
         """Auto-determine rack status based on remaining cups."""
         if remaining_cups <= 2:
@@ -64,8 +133,21 @@ class Game(models.Model):
             return "Rerack"
         return "Initial"
 
-    def process_game_stats(self):
-        """Processes the game state to update team stats based on made cups."""
+    def apply_cups(self, cups):
+        """Add a round's newly hit cups to the board, updating team stats in O(cups in the round)."""
+        teamA_made = sum(1 for cup_number in cups if int(cup_number) >= 79)
+        teamB_made = len(cups) - teamA_made
+
+        board = CupState(self.cups)
+        board.update(cups)
+        self.cups = board
+
+        self.teamA_cups_made += teamA_made
+        self.teamB_cups_made += teamB_made
+        self.update_remaining_cups()
+
+    def recompute(self):
+        """Recount team stats from the whole board (repair and verification)."""
         teamA_made = 0
         teamB_made = 0
 
@@ -80,27 +162,56 @@ class Game(models.Model):
         # Update team statistics
         self.teamA_cups_made = teamA_made
         self.teamB_cups_made = teamB_made
-        self.teamA_cups_remaining = 78 - teamA_made
-        self.teamB_cups_remaining = 78 - teamB_made  # Team A makes a shot, reducing Team B's remaining cups
+        self.update_remaining_cups()
+
+    def update_remaining_cups(self):
+        """Derive remaining cups (and rack status) from the made-cup counters."""
+        self.teamA_cups_remaining = 78 - self.teamA_cups_made
+        self.teamB_cups_remaining = 78 - self.teamB_cups_made  # Team A makes a shot, reducing Team B's remaining cups
 
         # Update rack status automatically
         # self.teamA_rack_status = self.determine_rack_status(self.teamA_cups_remaining)
         # self.teamB_rack_status = self.determine_rack_status(self.teamB_cups_remaining)
-        
+
     def check_winner(self):
         if self.teamB_cups_remaining == 0:
             self.status = "Completed"
-            self.gamewinner = self.team2
+            self.winner = self.team2
         if self.teamA_cups_remaining == 0:
             self.status = "Completed"
             self.winner = self.team1
 
-    
+    def record_result(self):
+        """Add this completed game to both teams' records and every player pair's head-to-head record."""
+        teamA_differential = self.teamA_cups_made - self.teamB_cups_made
+        for team_id, differential in ((self.team1_id, teamA_differential), (self.team2_id, -teamA_differential)):
+            won = int(self.winner_id == team_id)
+            Team.objects.filter(pk=team_id).update(
+                wins=models.F("wins") + won,
+                losses=models.F("losses") + (1 - won),
+                cup_differential=models.F("cup_differential") + differential,
+            )
+        PlayerPairStats.record_game(self)
+
+    # Status as last loaded from or written to the database
+    _saved_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get("status")
+        return instance
+
     def save(self, *args, **kwargs):
-        """Override save method to automatically process game stats."""
-        self.process_game_stats()
+        """Override save method to check for a winner (counters are kept by apply_cups/recompute)."""
         self.check_winner()
+        self.version += 1
+        just_completed = self.status == "Completed" and self._saved_status != "Completed"
         super().save(*args, **kwargs)
+        self._saved_status = self.status
+
+        if just_completed:
+            self.record_result()
 
         
 
@@ -108,13 +219,81 @@ class Game(models.Model):
 class Round(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="rounds")
     round_number = models.IntegerField()
-    cups = models.JSONField(default=dict)  # Track which player made which cup
+    cups = CupStateField(default=CupState)  # Track which player made which cup
     teamA_rack_status = models.CharField(max_length=20, choices=Game.RACK_STATUS_CHOICES, default="Initial")
     teamB_rack_status = models.CharField(max_length=20, choices=Game.RACK_STATUS_CHOICES, default="Initial")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "round_number"], name="unique_round_number_per_game"),
+        ]
+
     def __str__(self):
         return f"Round {self.round_number} of {self.game}"
 
+class RoundRequest(models.Model):
+    """Stored response for a round posted with an Idempotency-Key, replayed on client retries."""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="round_requests")
+    key = models.CharField(max_length=255)
+    status_code = models.IntegerField()
+    response = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "key"], name="unique_round_request_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} for {self.game}"
+
+class ShotEvent(models.Model):
+    """
+    Append-only log of every cup hit and death cup, one row per shot, written once per round.
+    PlayerStats, the Game counters and the rollups are projections of it (games/projections.py).
+    """
+    SIDE_CHOICES = [
+        ("teamA", "teamA"),
+        ("teamB", "teamB"),
+        ("", "Not on roster"),
+    ]
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="shot_events")
+    round_number = models.IntegerField()
+    cup = models.PositiveSmallIntegerField(null=True, blank=True)  # None for death cups
+    # Kept as sent even if the id is not on the roster (or not a user), like the board itself
+    shooter = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="shot_events")
+    side = models.CharField(max_length=5, choices=SIDE_CHOICES, blank=True)  # Shooter's side
+
+    is_clutch = models.BooleanField(default=False)
+    is_death = models.BooleanField(default=False)
+    is_own_cup = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["game", "round_number"], name="shotevent_game_round_idx"),
+        ]
+
+    def __str__(self):
+        shot = "death cup" if self.is_death else f"cup {self.cup}"
+        return f"Game {self.game_id} round {self.round_number}: {shot} by {self.shooter_id}"
+
+class GameSnapshot(models.Model):
+    """Board and roster counters after every GAME_SNAPSHOT_INTERVAL-th round, where replays resume (games/replay.py)."""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="snapshots")
+    round_number = models.IntegerField()
+    cups = CupStateField(default=CupState)
+    stats = models.JSONField(default=dict)  # {player_id: [counter, ...]} in replay.STATS_COUNTERS order
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "round_number"], name="unique_snapshot_round"),
+        ]
+
+    def __str__(self):
+        return f"Game {self.game_id} after round {self.round_number}"
+
 class PlayerStats(models.Model):
     player = models.ForeignKey(User, on_delete=models.CASCADE, related_name="player_stats")
     game = models.ForeignKey("Game", on_delete=models.CASCADE, related_name="game_stats")
@@ -130,13 +309,17 @@ class PlayerStats(models.Model):
     
     score = models.DecimalField(max_digits=4, decimal_places=2, default=0.0)
 
+    # Number of the last round that changed this row, for delta syncs
+    last_round = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Per-player drill-downs (profiles, recent form) without scanning every row
+            models.Index(fields=["player", "game"], name="playerstats_player_game_idx"),
+        ]
+
     def calculate_score(self):
         """Calculate HLTV 2.0 inspired rating for beer pong performance with team normalization."""
-        
-        # **Weights for Each Factor**
-        W_PLAYER_IMPACT = 1.2   # Player's share of total cups made
-        W_CLUTCH_CUPS = 0.15    # Clutch Cups bonus
-        W_OWN_CUPS = 0.40       # Own Cups penalty (more severe now)
 
         # **Baseline Score**
         score = 1.00
@@ -167,25 +350,24 @@ class PlayerStats(models.Model):
     def get_team_total_cups(self):
         """Retrieve the total number of cups made by this player's team."""
         game = self.game
-        if self.player in [game.team1.player1, game.team1.player2, game.team1.player3, game.team1.player4, game.team1.player5, game.team1.player6]:
+        if game.roster.side_of(self.player_id) == "teamA":
             return game.teamA_cups_made
         else:
             return game.teamB_cups_made
 
     def get_team_size(self):
         """Determine the number of active players on the player's team."""
-        game = self.game
-        team_players = [
-            game.team1.player1, game.team1.player2, game.team1.player3,
-            game.team1.player4, game.team1.player5, game.team1.player6
-        ] if self.player in [
-            game.team1.player1, game.team1.player2, game.team1.player3,
-            game.team1.player4, game.team1.player5, game.team1.player6
-        ] else [
-            game.team2.player1, game.team2.player2, game.team2.player3,
-            game.team2.player4, game.team2.player5, game.team2.player6
-        ]
-        return len([p for p in team_players if p is not None])  # Count only actual players
+        roster = self.game.roster
+        return len(roster.teamA) if roster.side_of(self.player_id) == "teamA" else len(roster.teamB)
+
+    def career_values(self):
+        """The totals this row contributes to the player's PlayerCareerStats."""
+        return {
+            "total_cups_made": self.cups_made,
+            "total_death_cups": self.death_cups,
+            "accuracy_sum": self.accuracy,
+            "score_sum": Decimal(str(self.score)),
+        }
 
     def save(self, *args, **kwargs):
         """Override save to auto-update the score before saving."""
@@ -193,4 +375,198 @@ class PlayerStats(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.player.username} - Game {self.game.id}: Score {self.score}"
\ No newline at end of file
+        return f"{self.player.username} - Game {self.game.id}: Score {self.score}"
+
+
+class StatsRollup(models.Model):
+    """Running sums of a player's PlayerStats rows, maintained incrementally; averages are derived from the sums."""
+    games_played = models.IntegerField(default=0)
+    total_cups_made = models.IntegerField(default=0)
+    total_death_cups = models.IntegerField(default=0)
+    accuracy_sum = models.FloatField(default=0.0)
+    score_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    average_accuracy = models.FloatField(default=0.0)
+    average_rating = models.FloatField(default=0.0)
+
+    SUM_FIELDS = ["games_played", "total_cups_made", "total_death_cups", "accuracy_sum", "score_sum"]
+
+    # Columns that split a player's totals into several rows, mapped to their PlayerStats lookup
+    SCOPE_FIELDS = {}
+
+    class Meta:
+        abstract = True
+
+    def update_averages(self):
+        """Derive the averages from the running sums."""
+        if self.games_played:
+            self.average_accuracy = self.accuracy_sum / self.games_played
+            self.average_rating = float(Decimal(self.score_sum) / self.games_played)
+        else:
+            self.average_accuracy = 0.0
+            self.average_rating = 0.0
+
+    @classmethod
+    def apply_changes(cls, changes, **scope):
+        """Add per-player deltas ({player_id: {field: delta}}) to the rows for `scope` in two or three queries."""
+        changes = {player_id: delta for player_id, delta in changes.items() if any(delta.values())}
+        if not changes:
+            return
+
+        rollups = {rollup.player_id: rollup for rollup in cls.objects.select_for_update().filter(player_id__in=changes, **scope)}
+        missing = [cls(player_id=player_id, **scope) for player_id in changes if player_id not in rollups]
+        if missing:
+            cls.objects.bulk_create(missing)
+            rollups.update({rollup.player_id: rollup for rollup in missing})
+
+        for player_id, delta in changes.items():
+            rollup = rollups[player_id]
+            for field, value in delta.items():
+                setattr(rollup, field, getattr(rollup, field) + value)
+            rollup.update_averages()
+
+        cls.objects.bulk_update(rollups.values(), cls.SUM_FIELDS + ["average_accuracy", "average_rating"])
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every row from scratch out of PlayerStats. Call inside a transaction: on Postgres the
+        table is locked first, so a round applying deltas meanwhile waits for the rebuild rather than
+        committing between its read and its rewrite and being lost.
+        """
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # EXCLUSIVE still lets the leaderboard read the old rows
+                cursor.execute(f"LOCK TABLE {connection.ops.quote_name(cls._meta.db_table)} IN EXCLUSIVE MODE")
+        totals = (
+            PlayerStats.objects
+            .values("player", **{name: models.F(lookup) for name, lookup in cls.SCOPE_FIELDS.items()})
+            .annotate(
+                games_played=models.Count("id"),
+                total_cups_made=models.Sum("cups_made"),
+                total_death_cups=models.Sum("death_cups"),
+                accuracy_sum=models.Sum("accuracy"),
+                score_sum=models.Sum("score"),
+            )
+        )
+        rollups = []
+        for entry in totals:
+            rollup = cls(player_id=entry.pop("player"), **entry)
+            rollup.update_averages()
+            rollups.append(rollup)
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(rollups, batch_size=1000)
+        return len(rollups)
+
+
+class PlayerCareerStats(StatsRollup):
+    """Career rollup of a player's PlayerStats rows, for the leaderboard and player profiles."""
+    player = models.OneToOneField(User, on_delete=models.CASCADE, related_name="career_stats")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-average_rating", "player"], name="career_rating_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.player.username} - {self.games_played} games: Rating {self.average_rating:.2f}"
+
+
+class PlayerModeStats(StatsRollup):
+    """Per-gamemode split of a player's career totals, for player profiles."""
+    player = models.ForeignKey(User, on_delete=models.CASCADE, related_name="mode_stats")
+    gamemode = models.CharField(max_length=20, choices=Game.GAMEMODE_CHOICES)
+
+    SCOPE_FIELDS = {"gamemode": "game__gamemode"}
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["player", "gamemode"], name="unique_player_gamemode"),
+        ]
+
+    def __str__(self):
+        return f"{self.player.username} - {self.gamemode}: Rating {self.average_rating:.2f}"
+
+
+class PlayerPairStats(models.Model):
+    """
+    Completed-game record of a player alongside (teammate) or against (opponent) another player,
+    stored in both directions so either player's lookups hit one row. Updated by Game.record_result.
+    """
+    RELATION_CHOICES = [
+        ("teammate", "Teammate"),
+        ("opponent", "Opponent"),
+    ]
+
+    player = models.ForeignKey(User, on_delete=models.CASCADE, related_name="pair_stats")
+    other = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    relation = models.CharField(max_length=10, choices=RELATION_CHOICES)
+
+    # From `player`'s point of view
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    cup_differential = models.IntegerField(default=0)
+
+    RECORD_FIELDS = ["games", "wins", "losses", "cup_differential"]
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["player", "other", "relation"], name="unique_player_pair"),
+        ]
+        indexes = [
+            # A player's most frequent partners (or opponents) first
+            models.Index(fields=["player", "relation", "-games", "other"], name="pair_by_games_idx"),
+        ]
+
+    @staticmethod
+    def game_changes(game):
+        """{(player_id, other_id, relation): {field: delta}} for every directed pair in a completed game."""
+        roster = game.roster
+        teamA_differential = game.teamA_cups_made - game.teamB_cups_made
+        changes = {}
+        for side, opponents, team_id, differential in (
+            (roster.teamA, roster.teamB, game.team1_id, teamA_differential),
+            (roster.teamB, roster.teamA, game.team2_id, -teamA_differential),
+        ):
+            won = int(game.winner_id == team_id)
+            record = {"games": 1, "wins": won, "losses": 1 - won, "cup_differential": differential}
+            for player_id in side:
+                for other_id in side - {player_id}:
+                    changes[(player_id, other_id, "teammate")] = record
+                for other_id in opponents:
+                    changes[(player_id, other_id, "opponent")] = record
+        return changes
+
+    @classmethod
+    def record_game(cls, game):
+        """Add a completed game to its player pairs in two or three queries."""
+        changes = cls.game_changes(game)
+        player_ids = game.roster.player_ids
+        pairs = {
+            (pair.player_id, pair.other_id, pair.relation): pair
+            for pair in cls.objects.select_for_update().filter(player_id__in=player_ids, other_id__in=player_ids)
+        }
+        missing = [
+            cls(player_id=player_id, other_id=other_id, relation=relation)
+            for (player_id, other_id, relation) in changes if (player_id, other_id, relation) not in pairs
+        ]
+        if missing:
+            cls.objects.bulk_create(missing)
+            pairs.update({(pair.player_id, pair.other_id, pair.relation): pair for pair in missing})
+
+        for key, delta in changes.items():
+            pair = pairs[key]
+            for field, value in delta.items():
+                setattr(pair, field, getattr(pair, field) + value)
+        cls.objects.bulk_update([pairs[key] for key in changes], cls.RECORD_FIELDS)
+
+    def __str__(self):
+        return f"{self.player_id} {self.relation} {self.other_id}: {self.wins}-{self.losses}"
+
+
+def apply_rollup_changes(changes, gamemode):
+    """Add per-player deltas from one game to the career totals and that gamemode's split."""
+    PlayerCareerStats.apply_changes(changes)
+    PlayerModeStats.apply_changes(changes, gamemode=gamemode)
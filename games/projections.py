@@ -0,0 +1,27 @@
+"""
+Projections of the ShotEvent log. The board and counters stored on Game and PlayerStats are
+kept up to date incrementally by round ingestion, but can always be rebuilt from the log
+(`manage.py rebuild_projections`).
+"""
+from itertools import groupby
+
+from .replay import ReplayState, Shot
+
+
+def project_game(game, events):
+    """
+    Fold a game's ShotEvents (in round order) into its board and team counters, and return
+    the PlayerStats counters of every roster player as {player_id: {counter: value}}.
+    """
+    state = ReplayState(game.roster)
+    for round_number, round_events in groupby(events, key=lambda event: event.round_number):
+        shots, deaths = [], []
+        for event in round_events:
+            if event.is_death:
+                deaths.append(event.shooter_id)
+            else:
+                shots.append(Shot(event.cup, event.shooter_id, event.side or None, event.is_own_cup, event.is_clutch))
+        state.apply_shots(round_number, shots, deaths)
+
+    state.to_game(game)
+    return state.stats
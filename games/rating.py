@@ -0,0 +1,47 @@
+"""
+Batch version of PlayerStats.calculate_score over NumPy arrays, for re-rating history.
+
+Every step mirrors the per-row formula in the same order with float64 arithmetic, and the
+final rounding uses Python's round() per element, so both paths produce identical scores.
+"""
+import numpy as np
+
+from .models import W_PLAYER_IMPACT, W_CLUTCH_CUPS, W_OWN_CUPS
+
+
+def team_cups(player_ids, teamA_slots, teamA_cups_made, teamB_cups_made):
+    """
+    Cups made by each row's side. `teamA_slots` is an (n, 6) array of team1's player ids with
+    empty slots set to -1; players not found there count as team B, like Roster.side_of.
+    """
+    on_teamA = (teamA_slots == player_ids[:, np.newaxis]).any(axis=1)
+    return np.where(on_teamA, teamA_cups_made, teamB_cups_made)
+
+
+def rate(cups_made, team_cups_made, clutch_cups, death_cups, own_cups):
+    """Scores for parallel integer arrays, as a list of floats rounded like calculate_score."""
+    cups_made = np.asarray(cups_made, dtype=np.float64)
+    team_cups_made = np.asarray(team_cups_made, dtype=np.float64)
+    death_cups = np.asarray(death_cups, dtype=np.float64)
+
+    # **Baseline Score**
+    score = np.full(len(cups_made), 1.00)
+
+    # **Normalize Player's Contribution to the Team**
+    player_impact = np.divide(cups_made, team_cups_made, out=np.zeros_like(cups_made), where=team_cups_made > 0)
+
+    # **Positive Contributions**
+    score += W_PLAYER_IMPACT * player_impact
+    score += W_CLUTCH_CUPS * np.asarray(clutch_cups, dtype=np.float64)
+
+    # **Exponential Impact for Death Cups**
+    score += np.where(death_cups > 0, np.power(1.5, death_cups) - 1, 0.0)
+
+    # **Negative Contributions**
+    score -= W_OWN_CUPS * np.asarray(own_cups, dtype=np.float64)
+
+    # **Ensure score stays within 0.00 to 2.00 range**
+    score = np.clip(score, 0.00, 2.00)
+
+    # np.round rounds binary halves differently from round(); keep the per-row rounding exactly
+    return [round(value, 2) for value in score.tolist()]
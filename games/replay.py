@@ -0,0 +1,148 @@
+"""
+Game replay: rebuild a game's board and per-player counters as they were after any round.
+
+State is folded from Round boards (plus the death cups logged as ShotEvents, which rounds do
+not store), starting from the nearest GameSnapshot, so reading round N costs one snapshot plus
+at most GAME_SNAPSHOT_INTERVAL - 1 rounds.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+
+from .fields import CupState
+from .models import Round, ShotEvent, GameSnapshot, PlayerStats
+
+STATS_COUNTERS = ["shots_taken", "cups_made", "own_cups", "clutch_cups", "death_cups", "last_round"]
+
+Shot = namedtuple("Shot", ["cup", "shooter_id", "side", "is_own_cup", "is_clutch"])
+
+
+def classify_cups(roster, cups):
+    """
+    Apply the scoring rules to one round's cups: a shot into the shooter's own side's cups is an
+    own cup, and a side's only hitter in a round gets a clutch. Shooters not on the roster score nothing.
+    """
+    shots = []
+    hitters = {"teamA": [], "teamB": []}
+    for cup, player_id in cups.items():
+        cup = int(cup)
+        side = roster.side_of(player_id)
+        # Cups 1-78 belong to Team A and are hit by Team B, the rest the other way round
+        is_own_cup = side is not None and side != ("teamB" if cup < 79 else "teamA")
+        if side is not None and not is_own_cup:
+            hitters[side].append(len(shots))
+        shots.append(Shot(cup, player_id, side, is_own_cup, False))
+
+    for side_hitters in hitters.values():
+        if len(side_hitters) == 1:
+            shots[side_hitters[0]] = shots[side_hitters[0]]._replace(is_clutch=True)
+    return shots
+
+
+class ReplayState:
+    """A game's board and roster counters after `round_number` rounds."""
+
+    def __init__(self, roster, round_number=0, board=None, stats=None):
+        self.roster = roster
+        self.round_number = round_number
+        self.board = CupState(board or {})
+        self.stats = stats or {player_id: dict.fromkeys(STATS_COUNTERS, 0) for player_id in roster.player_ids}
+
+    @classmethod
+    def from_snapshot(cls, roster, snapshot):
+        stats = {
+            int(player_id): dict(zip(STATS_COUNTERS, counters))
+            for player_id, counters in snapshot.stats.items()
+        }
+        return cls(roster, snapshot.round_number, snapshot.cups, stats)
+
+    def snapshot(self, game):
+        """Unsaved GameSnapshot of this state."""
+        return GameSnapshot(
+            game=game,
+            round_number=self.round_number,
+            cups=CupState(self.board),
+            stats={str(player_id): [counters[field] for field in STATS_COUNTERS] for player_id, counters in self.stats.items()},
+        )
+
+    def apply_shots(self, round_number, shots, death_shooter_ids=()):
+        """Fold one round given its classified shots and the players credited with a death cup."""
+        for shot in shots:
+            self.board[str(shot.cup)] = shot.shooter_id
+            counters = self.stats.get(shot.shooter_id)
+            if counters is None:
+                continue  # Not on the roster
+            if shot.is_own_cup:
+                counters["own_cups"] += 1
+            else:
+                counters["cups_made"] += 1
+            if shot.is_clutch:
+                counters["clutch_cups"] += 1
+
+        for player_id in death_shooter_ids:
+            counters = self.stats.get(player_id)
+            if counters is not None:
+                counters["death_cups"] += 1
+
+        # Every roster player takes a shot in every round
+        for counters in self.stats.values():
+            counters["shots_taken"] += 1
+            counters["last_round"] = round_number
+        self.round_number = round_number
+
+    def apply_round(self, round_number, cups, death_shooter_ids=()):
+        self.apply_shots(round_number, classify_cups(self.roster, cups), death_shooter_ids)
+
+    def to_game(self, game):
+        """Put this board and its team counters on `game` (not saved), for scoring and serializing."""
+        game.cups = CupState(self.board)
+        game.recompute()
+        return game
+
+    def player_stats(self, game):
+        """Unsaved PlayerStats rows for this state, scored against `game` as returned by to_game."""
+        player_stats = []
+        for player_id, counters in sorted(self.stats.items()):
+            stats = PlayerStats(game=game, player_id=player_id, **counters)
+            stats.score = stats.calculate_score()
+            player_stats.append(stats)
+        return player_stats
+
+
+def snapshot_due(round_number):
+    """Whether a snapshot is stored after this round."""
+    return round_number % settings.GAME_SNAPSHOT_INTERVAL == 0
+
+
+def replay(game, round_number=None, use_snapshots=True):
+    """
+    ReplayState of `game` after `round_number` (the latest round if None), resumed from the
+    nearest snapshot at or before it. Returns None if that round has not been played.
+    """
+    state = None
+    if use_snapshots:
+        snapshots = game.snapshots.order_by("-round_number")
+        if round_number is not None:
+            snapshots = snapshots.filter(round_number__lte=round_number)
+        snapshot = snapshots.first()
+        if snapshot is not None:
+            state = ReplayState.from_snapshot(game.roster, snapshot)
+    if state is None:
+        state = ReplayState(game.roster)
+
+    rounds = Round.objects.filter(game=game, round_number__gt=state.round_number).order_by("round_number")
+    deaths = ShotEvent.objects.filter(game=game, is_death=True, round_number__gt=state.round_number)
+    if round_number is not None:
+        rounds = rounds.filter(round_number__lte=round_number)
+        deaths = deaths.filter(round_number__lte=round_number)
+
+    deaths_by_round = {}
+    for death_round, shooter_id in deaths.values_list("round_number", "shooter_id"):
+        deaths_by_round.setdefault(death_round, []).append(shooter_id)
+
+    for game_round in rounds.only("round_number", "cups"):
+        state.apply_round(game_round.round_number, game_round.cups, deaths_by_round.get(game_round.round_number, ()))
+
+    if round_number is not None and state.round_number != round_number:
+        return None
+    return state
@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from .models import Round, Game, PlayerStats
+from .models import Round, Game, PlayerStats, Team
 from users.models import User
 
 class RoundSerializer(serializers.ModelSerializer):
+    cups = serializers.JSONField()
+
     class Meta:
         model = Round
         fields = ['id', 'game', 'round_number', 'cups']
@@ -22,7 +24,20 @@ class GameListSerializer(serializers.ModelSerializer):
         return obj.winner.team_name if obj.winner else "TBD"
 
 
+class TeamRecordSerializer(serializers.ModelSerializer):
+    games_played = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Team
+        fields = ["id", "team_name", "games_played", "wins", "losses", "cup_differential"]
+
+    def get_games_played(self, obj):
+        """Completed games only, the ones counted in the record."""
+        return obj.wins + obj.losses
+
+
 class GameStateSerializer(serializers.ModelSerializer):
+    cups = serializers.JSONField()
     player_stats = serializers.SerializerMethodField()
 
     class Meta:
@@ -36,34 +51,90 @@ class GameStateSerializer(serializers.ModelSerializer):
 
     def get_player_stats(self, obj):
         """Retrieve player statistics grouped by team."""
-        # Fetch all player stats for the given game
-        player_stats = PlayerStats.objects.filter(game=obj)
-        
-        # Group players into Team A and Team B
-        teamA_players = [
-            obj.team1.player1, obj.team1.player2, obj.team1.player3,
-            obj.team1.player4, obj.team1.player5, obj.team1.player6
-        ]
-        teamB_players = [
-            obj.team2.player1, obj.team2.player2, obj.team2.player3,
-            obj.team2.player4, obj.team2.player5, obj.team2.player6
-        ]
-        
-        # Build the grouped response
+        # Player stats for the given game (prefetched with their users by GameStateView)
+        player_stats = obj.game_stats.all()
+
+        # Build the grouped response, keyed by each player's side of the roster
         grouped_stats = {
             "teamA": {},
             "teamB": {}
         }
 
         for stat in player_stats:
-            player_id = str(stat.player.pk)
-            serialized_data = PlayerStatsSerializer(stat).data
+            side = obj.roster.side_of(stat.player_id)
+            if side is not None:
+                grouped_stats[side][str(stat.player_id)] = PlayerStatsSerializer(stat).data
 
-            if stat.player in teamA_players:
-                grouped_stats["teamA"][player_id] = serialized_data
-            elif stat.player in teamB_players:
-                grouped_stats["teamB"][player_id] = serialized_data
+        return grouped_stats
 
+
+class GameDeltaSerializer(serializers.ModelSerializer):
+    """Game state changes after a given round, for clients that reconnect mid-game."""
+    rounds = serializers.SerializerMethodField()
+    cups = serializers.SerializerMethodField()
+    player_stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Game
+        fields = [
+            "id", "version", "status", "teamA_rack_status", "teamB_rack_status",
+            "teamA_cups_made", "teamB_cups_made",
+            "teamA_cups_remaining", "teamB_cups_remaining",
+            "rounds", "cups", "player_stats", "winner"
+        ]
+
+    def get_rounds(self, obj):
+        """Rounds played after the client's last round, in order."""
+        return RoundSerializer(self.context["rounds"], many=True).data
+
+    def get_cups(self, obj):
+        """Cups hit in those rounds only."""
+        cups = {}
+        for game_round in self.context["rounds"]:
+            cups.update(game_round.cups)
+        return cups
+
+    def get_player_stats(self, obj):
+        """Player statistics changed in those rounds, grouped by team."""
+        grouped_stats = {
+            "teamA": {},
+            "teamB": {}
+        }
+        for stat in self.context["player_stats"]:
+            side = obj.roster.side_of(stat.player_id)
+            if side is not None:
+                grouped_stats[side][str(stat.player_id)] = PlayerStatsSerializer(stat).data
+        return grouped_stats
+
+
+class GameReplaySerializer(serializers.ModelSerializer):
+    """Board and player statistics as replayed right after a given round."""
+    round_number = serializers.SerializerMethodField()
+    cups = serializers.JSONField()
+    player_stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Game
+        fields = [
+            "id", "round_number",
+            "teamA_cups_made", "teamB_cups_made",
+            "teamA_cups_remaining", "teamB_cups_remaining",
+            "cups", "player_stats"
+        ]
+
+    def get_round_number(self, obj):
+        return self.context["round_number"]
+
+    def get_player_stats(self, obj):
+        """Replayed player statistics, grouped by team."""
+        grouped_stats = {
+            "teamA": {},
+            "teamB": {}
+        }
+        for stat in self.context["player_stats"]:
+            side = obj.roster.side_of(stat.player_id)
+            if side is not None:
+                grouped_stats[side][str(stat.player_id)] = PlayerStatsSerializer(stat).data
         return grouped_stats
 
 
@@ -91,7 +162,9 @@ class RoundResponseSerializer(serializers.ModelSerializer):
         
     def get_player_stats(self, obj):
         """Retrieve player statistics for the game."""
-        player_stats = PlayerStats.objects.filter(game=obj.game)
+        player_stats = self.context.get("player_stats")
+        if player_stats is None:
+            player_stats = PlayerStats.objects.filter(game=obj.game).select_related("player")
         return {str(stat.player.pk): PlayerStatsSerializer(stat).data for stat in player_stats}
 
 class PlayerStatsSerializer(serializers.ModelSerializer):
@@ -107,7 +180,8 @@ class PlayerStatsSerializer(serializers.ModelSerializer):
             ]
         
 class LeaderboardSerializer(serializers.Serializer):  # Use Serializer, not ModelSerializer
-    player_name = serializers.CharField()  # Directly provide the player name
+    player_id = serializers.IntegerField(source="player")  # Keyset cursor together with average_rating
+    player_name = serializers.CharField(source="player__username")  # Username folded into the rollup query
     games_played = serializers.IntegerField()
     total_cups_made = serializers.IntegerField()
     average_accuracy = serializers.FloatField()
@@ -116,4 +190,51 @@ class LeaderboardSerializer(serializers.Serializer):  # Use Serializer, not Mode
 
     class Meta:
         model = User
-        fields = ["id", "player_name", "games_played", "total_cups_made", "average_accuracy", "total_death_cups", "average_rating"]
+        fields = ["player_id", "player_name", "games_played", "total_cups_made", "average_accuracy", "total_death_cups", "average_rating"]
+
+
+class RollupSerializer(serializers.Serializer):
+    """Totals and averages of a PlayerCareerStats or PlayerModeStats row."""
+    games_played = serializers.IntegerField()
+    total_cups_made = serializers.IntegerField()
+    total_death_cups = serializers.IntegerField()
+    average_accuracy = serializers.FloatField()
+    average_rating = serializers.FloatField()
+
+
+class PlayerModeSerializer(RollupSerializer):
+    gamemode = serializers.CharField()
+
+
+class PlayerGameSerializer(serializers.ModelSerializer):
+    """One game from a player's point of view, for recent form and best/worst ratings."""
+    game_id = serializers.IntegerField(source="game.id")
+    gamemode = serializers.CharField(source="game.gamemode")
+    status = serializers.CharField(source="game.status")
+    created_at = serializers.DateTimeField(source="game.created_at")
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PlayerStats
+        fields = ["game_id", "gamemode", "status", "created_at", "cups_made", "death_cups", "accuracy", "score", "result"]
+
+    def get_result(self, obj):
+        """'W' or 'L' once the game is completed, otherwise None."""
+        game = obj.game
+        if game.status != "Completed" or game.winner_id is None:
+            return None
+        team_id = game.team1_id if game.roster.side_of(obj.player_id) == "teamA" else game.team2_id
+        return "W" if game.winner_id == team_id else "L"
+
+
+class PairRecordSerializer(serializers.Serializer):
+    """Completed-game record of a player pair, from the first player's point of view."""
+    games = serializers.IntegerField()
+    wins = serializers.IntegerField()
+    losses = serializers.IntegerField()
+    cup_differential = serializers.IntegerField()
+
+
+class PartnerSerializer(PairRecordSerializer):
+    player_id = serializers.IntegerField(source="other")
+    player_name = serializers.CharField(source="other__username")
@@ -1,10 +1,39 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, SimpleTestCase, override_settings
 from django.urls import reverse
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
-from .models import User, Team, Game, Round
+from tracker.metrics import MetricsRegistry
+from .models import User, Team, Game, Round, PlayerStats, PlayerCareerStats, ShotEvent, GameSnapshot
+from .events import GameEventBackend, InProcessGameEventBackend, get_backend
+from .fields import CupState
+from .rating import rate
+
+
+class RecordingGameEventBackend(InProcessGameEventBackend):
+    """Keeps published events in memory so tests can assert on them."""
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, game_id, event):
+        self.published.append((game_id, event))
+        super().publish(game_id, event)
 
 class GameAndRoundTests(TestCase):
     def setUp(self):
+        cache.clear()
+
         # Create test users with unique emails
         self.user1 = User.objects.create(username="Player1", email="player1@example.com")
         self.user2 = User.objects.create(username="Player2", email="player2@example.com")
@@ -20,7 +49,7 @@ class GameAndRoundTests(TestCase):
         self.players_team2 = [self.user4.pk, self.user5.pk, self.user6.pk, self.user8.pk]
 
     def test_create_game(self):
-        url = reverse("start-game")
+        url = reverse("new-game")
         data = {
             "game_settings": {"gamemode": "Casual", "teamsize": 4},
             "teams": {
@@ -38,10 +67,565 @@ class GameAndRoundTests(TestCase):
         team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
         game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
         
-        url = reverse("new-round") + f"?game_id={game.id}"
+        url = reverse("new-round", kwargs={"game_id": game.id})
         data = {"gamestate": {"cups": {"1": "5", "2": "3", "10": "8"}}}
         response = self.client.post(url, data, content_type="application/json")
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Round.objects.count(), 1)
         self.assertEqual(Round.objects.first().round_number, 1)
+
+    def test_round_query_count_is_constant(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3, player4=self.user7)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6, player4=self.user8)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=4, gamemode="Casual")
+        url = reverse("new-round", kwargs={"game_id": game.id})
+
+        # First round creates the missing PlayerStats rows
+        self.client.post(url, {"gamestate": {"cups": {"1": self.user4.pk}}}, content_type="application/json")
+
+        with CaptureQueriesContext(connection) as small_round:
+            response = self.client.post(url, {"gamestate": {"cups": {"2": self.user5.pk}}}, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        big_cups = {"3": self.user4.pk, "4": self.user5.pk, "5": self.user6.pk, "6": self.user8.pk,
+                    "79": self.user1.pk, "80": self.user2.pk, "81": self.user3.pk, "82": self.user7.pk}
+        data = {"gamestate": {"cups": big_cups, "deathcups": [self.user1.pk, self.user4.pk]}}
+        with CaptureQueriesContext(connection) as big_round:
+            response = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small_round), len(big_round))
+
+        stats = PlayerStats.objects.get(game=game, player=self.user4)
+        self.assertEqual(stats.shots_taken, 3)
+        self.assertEqual(stats.cups_made, 2)
+        self.assertEqual(stats.clutch_cups, 1)
+        self.assertEqual(stats.death_cups, 1)
+        self.assertEqual(PlayerStats.objects.filter(game=game).count(), 8)
+
+    def test_round_retry_with_idempotency_key(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        url = reverse("new-round", kwargs={"game_id": game.id})
+        data = {"gamestate": {"cups": {"1": self.user4.pk}}}
+
+        first = self.client.post(url, data, content_type="application/json", HTTP_IDEMPOTENCY_KEY="round-1")
+        retry = self.client.post(url, data, content_type="application/json", HTTP_IDEMPOTENCY_KEY="round-1")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Round.objects.filter(game=game).count(), 1)
+        self.assertEqual(PlayerStats.objects.get(game=game, player=self.user4).cups_made, 1)
+
+    def test_roster_lookups_do_not_load_players(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3, player4=self.user7)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        created = Game.objects.create(team1=team1, team2=team2, team_size=4, gamemode="Casual")
+        game = Game.objects.select_related("team1", "team2").get(pk=created.pk)
+        stats = PlayerStats(player_id=self.user7.pk, game=game)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(game.roster.side_of(self.user7.pk), "teamA")
+            self.assertEqual(game.roster.side_of(self.user4.pk), "teamB")
+            self.assertIsNone(game.roster.side_of(self.user8.pk))
+            self.assertEqual(stats.get_team_size(), 4)
+            self.assertEqual(stats.get_team_total_cups(), game.teamA_cups_made)
+
+    def test_game_state_query_budget(self):
+        url = reverse("new-game")
+        data = {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": self.players_team1},
+                "team2": {"name": "Team B", "players": self.players_team2}
+            }
+        }
+        game_id = self.client.post(url, data, content_type="application/json").json()["game_id"]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("game-state", kwargs={"game_id": game_id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["player_stats"]["teamA"]), 4)
+        self.assertEqual(len(response.json()["player_stats"]["teamB"]), 4)
+
+    def test_game_state_conditional_get(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        url = reverse("game-state", kwargs={"game_id": game.id})
+
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse("new-round", kwargs={"game_id": game.id}), {"gamestate": {"cups": {"1": self.user4.pk}}}, content_type="application/json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["teamB_cups_made"], 1)
+
+    def test_career_stats_track_rounds(self):
+        url = reverse("new-game")
+        data = {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": self.players_team1},
+                "team2": {"name": "Team B", "players": self.players_team2}
+            }
+        }
+        game_id = self.client.post(url, data, content_type="application/json").json()["game_id"]
+        round_url = reverse("new-round", kwargs={"game_id": game_id})
+        self.client.post(round_url, {"gamestate": {"cups": {"1": self.user4.pk, "79": self.user1.pk}}}, content_type="application/json")
+        self.client.post(round_url, {"gamestate": {"cups": {"2": self.user4.pk}, "deathcups": [self.user4.pk]}}, content_type="application/json")
+
+        live = {career.player_id: career for career in PlayerCareerStats.objects.all()}
+        PlayerCareerStats.rebuild()
+        rebuilt = {career.player_id: career for career in PlayerCareerStats.objects.all()}
+
+        self.assertEqual(len(live), 8)
+        self.assertEqual(live[self.user4.pk].total_cups_made, 2)
+        self.assertEqual(live[self.user4.pk].total_death_cups, 1)
+        for player_id, career in rebuilt.items():
+            self.assertEqual(live[player_id].games_played, career.games_played)
+            self.assertEqual(live[player_id].score_sum, career.score_sum)
+            self.assertAlmostEqual(live[player_id].average_rating, career.average_rating)
+
+        leaderboard = self.client.get(reverse("leaderboard")).json()
+        self.assertEqual(len(leaderboard), 8)
+        self.assertEqual([entry["player_name"] for entry in leaderboard[:2]], [self.user1.username, self.user4.username])
+
+    def test_leaderboard_keyset_pages(self):
+        for rating, user in [(1.5, self.user1), (1.2, self.user2), (1.2, self.user3), (0.9, self.user4)]:
+            PlayerCareerStats.objects.create(player=user, games_played=1, score_sum=rating, average_rating=rating)
+
+        with self.assertNumQueries(1):
+            first_page = self.client.get(reverse("leaderboard"), {"limit": 2}).json()
+        last = first_page[-1]
+        second_page = self.client.get(
+            reverse("leaderboard"), {"limit": 2, "after_rating": last["average_rating"], "after_id": last["player_id"]}
+        ).json()
+
+        self.assertEqual([entry["player_name"] for entry in first_page], ["Player1", "Player2"])
+        self.assertEqual([entry["player_name"] for entry in second_page], ["Player3", "Player4"])
+
+    def test_game_list_cursor_pages(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        games = [Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode=mode) for mode in ["Casual", "IFC", "Casual"]]
+
+        with self.assertNumQueries(1):
+            first_page = self.client.get(reverse("game-list"), {"limit": 2}).json()
+        second_page = self.client.get(first_page["next"]).json()
+        casual = self.client.get(reverse("game-list"), {"gamemode": "Casual"}).json()
+
+        self.assertEqual([game["id"] for game in first_page["results"]], [games[2].id, games[1].id])
+        self.assertEqual([game["id"] for game in second_page["results"]], [games[0].id])
+        self.assertEqual(first_page["results"][0]["team1_name"], "Team A")
+        self.assertEqual([game["id"] for game in casual["results"]], [games[2].id, games[0].id])
+
+    @override_settings(GAME_EVENTS_BACKEND="games.tests.RecordingGameEventBackend")
+    def test_round_publishes_event_after_commit(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        backend = get_backend()
+        backend.published.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("new-round", kwargs={"game_id": game.id}), {"gamestate": {"cups": {"1": self.user4.pk}}}, content_type="application/json")
+
+        [(game_id, event)] = backend.published
+        self.assertEqual(game_id, game.id)
+        self.assertEqual(event["cups"], {"1": self.user4.pk})
+        self.assertEqual(event["teamB_cups_made"], 1)
+        self.assertEqual(event["player_stats"][str(self.user4.pk)]["cups_made"], 1)
+
+
+    def test_game_state_since_round(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        round_url = reverse("new-round", kwargs={"game_id": game.id})
+        self.client.post(round_url, {"gamestate": {"cups": {"1": self.user4.pk}}}, content_type="application/json")
+        self.client.post(round_url, {"gamestate": {"cups": {"79": self.user1.pk}}}, content_type="application/json")
+
+        with self.assertNumQueries(3):
+            delta = self.client.get(reverse("game-state", kwargs={"game_id": game.id}), {"since_round": 1}).json()
+
+        self.assertEqual([game_round["round_number"] for game_round in delta["rounds"]], [2])
+        self.assertEqual(delta["cups"], {"79": self.user1.pk})
+        self.assertEqual(delta["teamA_cups_made"], 1)
+        self.assertEqual(delta["version"], Game.objects.get(pk=game.id).version)
+        self.assertEqual(len(delta["player_stats"]["teamA"]) + len(delta["player_stats"]["teamB"]), 6)
+
+
+    def test_incremental_counters_match_recompute(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        game.apply_cups(CupState.parse({"1": self.user4.pk, "79": self.user1.pk}))
+        game.apply_cups(CupState.parse({"80": self.user2.pk, "81": self.user3.pk}))
+        incremental = (game.teamA_cups_made, game.teamB_cups_made, game.teamA_cups_remaining, game.teamB_cups_remaining)
+
+        game.recompute()
+
+        self.assertEqual(incremental, (3, 1, 75, 77))
+        self.assertEqual(incremental, (game.teamA_cups_made, game.teamB_cups_made, game.teamA_cups_remaining, game.teamB_cups_remaining))
+
+
+    def test_round_batch_applies_backlog(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        url = reverse("round-batch", kwargs={"game_id": game.id})
+        rounds = [
+            {"gamestate": {"cups": {"1": self.user4.pk}}},
+            {"gamestate": {"cups": {"79": self.user1.pk, "80": self.user2.pk}}},
+            {"gamestate": {"cups": {"2": self.user5.pk}, "deathcups": [self.user5.pk]}},
+        ]
+
+        invalid = self.client.post(url, {"rounds": rounds + [{"gamestate": {"cups": {"1": self.user6.pk}}}]}, content_type="application/json")
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(invalid.json()["rounds"][0]["index"], 3)
+        self.assertFalse(Round.objects.filter(game=game).exists())
+
+        for deathcups in (5, ["abc"]):
+            invalid = self.client.post(url, {"rounds": [{"gamestate": {"cups": {"1": self.user4.pk}, "deathcups": deathcups}}]}, content_type="application/json")
+            self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(invalid.json()["rounds"][0]["index"], 0)
+        invalid = self.client.post(
+            reverse("new-round", kwargs={"game_id": game.id}),
+            {"gamestate": {"cups": {"1": self.user4.pk}, "deathcups": 5}}, content_type="application/json",
+        )
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        for body in ([], {"gamestate": []}):
+            invalid = self.client.post(reverse("new-round", kwargs={"game_id": game.id}), body, content_type="application/json")
+            self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        invalid = self.client.post(url, rounds, content_type="application/json")
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Round.objects.filter(game=game).exists())
+
+        response = self.client.post(url, {"rounds": rounds}, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        results = response.json()["rounds"]
+        self.assertEqual([result["round_number"] for result in results], [1, 2, 3])
+        self.assertEqual([result["teamA_cups_made"] for result in results], [0, 2, 2])
+
+        game.refresh_from_db()
+        self.assertEqual((game.teamA_cups_made, game.teamB_cups_made), (2, 2))
+        stats = PlayerStats.objects.get(game=game, player=self.user5)
+        self.assertEqual((stats.shots_taken, stats.cups_made, stats.death_cups, stats.last_round), (3, 1, 1, 3))
+
+
+    def test_create_game_query_count_and_slot_order(self):
+        url = reverse("new-game")
+        reversed_team1 = list(reversed(self.players_team1))
+        data = {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": reversed_team1},
+                "team2": {"name": "Team B", "players": self.players_team2}
+            }
+        }
+        with CaptureQueriesContext(connection) as first_game:
+            response = self.client.post(url, data, content_type="application/json")
+        with CaptureQueriesContext(connection) as second_game:
+            self.client.post(url, data, content_type="application/json")
+
+        game = Game.objects.select_related("team1").get(pk=response.json()["game_id"])
+        self.assertEqual(game.team1.player_ids, reversed_team1)
+        self.assertEqual(PlayerStats.objects.filter(game=game).count(), 8)
+        self.assertEqual(float(PlayerStats.objects.filter(game=game).first().score), 1.0)
+        # Users, team lookup, two teams, game, stats, careers and gamemode splits (select + bulk_create + bulk_update each) and savepoints
+        self.assertLessEqual(len(second_game), len(first_game))
+        self.assertLessEqual(len(first_game), 14)
+
+    def test_create_game_rejects_unsupported_team_size(self):
+        for team_size, players in ((7, list(range(1, 8))), (2, [self.user1.pk, self.user2.pk])):
+            response = self.client.post(reverse("new-game"), {
+                "game_settings": {"gamemode": "Casual", "teamsize": team_size},
+                "teams": {"team1": {"name": "Team A", "players": players}, "team2": {"name": "Team B", "players": players}},
+            }, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Game.objects.exists())
+
+
+    def test_recurring_lineups_share_team_record(self):
+        url = reverse("new-game")
+        data = {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": self.players_team1},
+                "team2": {"name": "Team B", "players": self.players_team2}
+            }
+        }
+        first_id = self.client.post(url, data, content_type="application/json").json()["game_id"]
+        data["teams"]["team1"]["players"] = list(reversed(self.players_team1))
+        data["teams"]["team1"]["name"] = "Renamed"
+        second_id = self.client.post(url, data, content_type="application/json").json()["game_id"]
+        self.assertEqual(Team.objects.count(), 2)
+        self.assertEqual(Game.objects.get(pk=first_id).team1.team_name, "Team A")  # Earlier games keep their name
+
+        for game_id in (first_id, second_id):
+            Game.objects.filter(pk=game_id).update(teamA_cups_made=77, teamA_cups_remaining=1, status="In-Progress")
+            self.client.post(reverse("new-round", kwargs={"game_id": game_id}), {"gamestate": {"cups": {"79": self.user1.pk}}}, content_type="application/json")
+
+        game = Game.objects.get(pk=second_id)
+        self.assertEqual(game.status, "Completed")
+        record = self.client.get(reverse("team-record", kwargs={"team_id": game.team1_id})).json()
+        self.assertEqual((record["wins"], record["losses"], record["cup_differential"]), (2, 0, 156))
+        record = self.client.get(reverse("team-record", kwargs={"team_id": game.team2_id})).json()
+        self.assertEqual((record["games_played"], record["losses"]), (2, 2))
+
+
+    def test_player_profile_from_rollups(self):
+        url = reverse("new-game")
+        game_ids = []
+        for gamemode in ["Casual", "IFC"]:
+            response = self.client.post(url, {
+                "game_settings": {"gamemode": gamemode, "teamsize": 4},
+                "teams": {
+                    "team1": {"name": "Team A", "players": self.players_team1},
+                    "team2": {"name": "Team B", "players": self.players_team2},
+                },
+            }, content_type="application/json")
+            game_ids.append(response.json()["game_id"])
+        self.client.post(
+            reverse("new-round", kwargs={"game_id": game_ids[0]}),
+            {"gamestate": {"cups": {"80": self.user1.pk, "81": self.user1.pk}}}, content_type="application/json",
+        )
+
+        with self.assertNumQueries(5):
+            profile = self.client.get(reverse("player-profile", kwargs={"player_id": self.user1.pk}), {"recent": 1}).json()
+
+        self.assertEqual(profile["career"]["games_played"], 2)
+        self.assertEqual(profile["career"]["total_cups_made"], 2)
+        modes = {split["gamemode"]: split for split in profile["gamemodes"]}
+        self.assertEqual(modes["Casual"]["total_cups_made"], 2)
+        self.assertEqual(modes["IFC"]["games_played"], 1)
+        self.assertEqual([game["game_id"] for game in profile["recent_form"]["games"]], [game_ids[1]])
+        self.assertIsNone(profile["best_rating"])  # No completed games yet
+
+
+    def test_batch_rating_matches_calculate_score(self):
+        game = Game(team1=Team(player1_id=1), team2=Team(player1_id=2))
+        columns, expected = [], []
+        for row in itertools.product(range(6), range(9), range(3), range(4), range(3)):
+            cups_made, game.teamA_cups_made, clutch, death, own = row
+            stats = PlayerStats(game=game, player_id=1, cups_made=cups_made, clutch_cups=clutch, death_cups=death, own_cups=own)
+            expected.append(stats.calculate_score())
+            columns.append(row)
+
+        self.assertEqual(rate(*zip(*columns)), expected)
+
+    def test_rerate_command_restores_scores_and_rollups(self):
+        url = reverse("new-game")
+        response = self.client.post(url, {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": self.players_team1},
+                "team2": {"name": "Team B", "players": self.players_team2},
+            },
+        }, content_type="application/json")
+        game_id = response.json()["game_id"]
+        self.client.post(
+            reverse("new-round", kwargs={"game_id": game_id}),
+            {"gamestate": {"cups": {"80": self.user1.pk, "81": self.user2.pk, "1": self.user4.pk}, "deathcups": [self.user4.pk]}},
+            content_type="application/json",
+        )
+        expected = {stats.pk: stats.score for stats in PlayerStats.objects.all()}
+        career_before = PlayerCareerStats.objects.get(player=self.user4).score_sum
+        version = Game.objects.get(pk=game_id).version
+
+        PlayerStats.objects.update(score=0)
+        call_command("rerate_player_stats", "--chunk-size", "3", stdout=StringIO())
+
+        self.assertEqual({stats.pk: stats.score for stats in PlayerStats.objects.all()}, expected)
+        self.assertGreater(Game.objects.get(pk=game_id).version, version)  # Cached game states go stale
+        self.assertEqual(PlayerCareerStats.objects.get(player=self.user4).score_sum, career_before)
+
+
+    def test_rounds_append_shot_events_and_projections_rebuild(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        url = reverse("new-round", kwargs={"game_id": game.id})
+        self.client.post(url, {"gamestate": {"cups": {"1": self.user4.pk, "2": self.user1.pk, "79": self.user2.pk}}}, content_type="application/json")
+        self.client.post(url, {"gamestate": {"cups": {"42": self.user5.pk}, "deathcups": [self.user5.pk]}}, content_type="application/json")
+
+        hit = ShotEvent.objects.get(game=game, cup=42)
+        self.assertEqual((hit.round_number, hit.shooter_id, hit.side, hit.is_clutch), (2, self.user5.pk, "teamB", True))
+        self.assertTrue(ShotEvent.objects.get(game=game, cup=2).is_own_cup)
+        self.assertEqual(ShotEvent.objects.filter(game=game, is_death=True).count(), 1)
+
+        expected = {stats.player_id: (stats.cups_made, stats.own_cups, stats.clutch_cups, stats.death_cups, stats.shots_taken, stats.score)
+                    for stats in PlayerStats.objects.filter(game=game)}
+        Game.objects.filter(pk=game.pk).update(teamB_cups_made=0)
+        PlayerStats.objects.filter(game=game).update(cups_made=9, own_cups=0, death_cups=0, score=0)
+
+        out = StringIO()
+        call_command("rebuild_projections", stdout=out)
+        self.assertIn("1 drifted games repaired", out.getvalue())
+        self.assertEqual({stats.player_id: (stats.cups_made, stats.own_cups, stats.clutch_cups, stats.death_cups, stats.shots_taken, stats.score)
+                          for stats in PlayerStats.objects.filter(game=game)}, expected)
+        self.assertEqual(Game.objects.get(pk=game.pk).teamB_cups_made, 3)
+
+        # Repairing only player stats still moves the version on, so cached game states go stale
+        version = Game.objects.get(pk=game.pk).version
+        PlayerStats.objects.filter(game=game).update(score=0)
+        call_command("rebuild_projections", stdout=StringIO())
+        self.assertEqual(Game.objects.get(pk=game.pk).version, version + 1)
+
+
+    @override_settings(GAME_SNAPSHOT_INTERVAL=2)
+    def test_replay_game_at_round_from_snapshots(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+        url = reverse("new-round", kwargs={"game_id": game.id})
+        self.client.post(url, {"gamestate": {"cups": {"1": self.user4.pk, "79": self.user1.pk}}}, content_type="application/json")
+        self.client.post(url, {"gamestate": {"cups": {"2": self.user5.pk}, "deathcups": [self.user5.pk]}}, content_type="application/json")
+        self.client.post(url, {"gamestate": {"cups": {"80": self.user2.pk, "81": self.user3.pk}}}, content_type="application/json")
+        self.assertEqual(list(GameSnapshot.objects.filter(game=game).values_list("round_number", flat=True)), [2])
+
+        first = self.client.get(reverse("game-replay", kwargs={"game_id": game.id, "round_number": 1})).json()
+        self.assertEqual(first["cups"], {"1": self.user4.pk, "79": self.user1.pk})
+        self.assertEqual(first["player_stats"]["teamB"][str(self.user5.pk)]["death_cups"], 0)
+
+        # Game, snapshot, rounds after it, their death cups and usernames
+        with self.assertNumQueries(5):
+            latest = self.client.get(reverse("game-replay", kwargs={"game_id": game.id, "round_number": 3})).json()
+        live = self.client.get(reverse("game-state", kwargs={"game_id": game.id})).json()
+        self.assertEqual(latest["cups"], live["cups"])
+        self.assertEqual(latest["player_stats"], live["player_stats"])
+        self.assertEqual(self.client.get(reverse("game-replay", kwargs={"game_id": game.id, "round_number": 4})).status_code, 404)
+
+        out = StringIO()
+        call_command("verify_games", stdout=out)
+        self.assertIn("0 of 1 games differ", out.getvalue())
+        PlayerStats.objects.filter(game=game, player=self.user2).update(cups_made=5)
+        call_command("verify_games", stdout=out)
+        self.assertIn(f"player {self.user2.pk} cups_made live 5, replayed 1", out.getvalue())
+
+
+    def test_pair_index_records_head_to_head(self):
+        url = reverse("new-game")
+        data = {
+            "game_settings": {"gamemode": "Casual", "teamsize": 4},
+            "teams": {
+                "team1": {"name": "Team A", "players": self.players_team1},
+                "team2": {"name": "Team B", "players": self.players_team2}
+            }
+        }
+        game_id = self.client.post(url, data, content_type="application/json").json()["game_id"]
+        Game.objects.filter(pk=game_id).update(teamA_cups_made=77, teamA_cups_remaining=1, status="In-Progress")
+        self.client.post(reverse("new-round", kwargs={"game_id": game_id}), {"gamestate": {"cups": {"79": self.user1.pk}}}, content_type="application/json")
+
+        with self.assertNumQueries(1):
+            matchup = self.client.get(reverse("player-matchup", kwargs={"player_id": self.user1.pk, "other_id": self.user4.pk})).json()
+        self.assertEqual(matchup["opponent"], {"games": 1, "wins": 1, "losses": 0, "cup_differential": 78})
+        self.assertEqual(matchup["teammate"]["games"], 0)
+        reverse_matchup = self.client.get(reverse("player-matchup", kwargs={"player_id": self.user4.pk, "other_id": self.user1.pk})).json()
+        self.assertEqual(reverse_matchup["opponent"]["losses"], 1)
+
+        partners = self.client.get(reverse("player-partners", kwargs={"player_id": self.user1.pk})).json()
+        self.assertEqual(sorted(partner["player_id"] for partner in partners), sorted(set(self.players_team1) - {self.user1.pk}))
+        self.assertEqual(partners[0]["wins"], 1)
+
+
+    def test_game_events_refuses_to_stream_under_wsgi(self):
+        team1 = Team.objects.create(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = Team.objects.create(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = Game.objects.create(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+
+        response = self.client.get(reverse("game-events", kwargs={"game_id": game.id}))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    async def test_game_events_streams_published_rounds_under_asgi(self):
+        team1 = await Team.objects.acreate(team_name="Team A", player1=self.user1, player2=self.user2, player3=self.user3)
+        team2 = await Team.objects.acreate(team_name="Team B", player1=self.user4, player2=self.user5, player3=self.user6)
+        game = await Game.objects.acreate(team1=team1, team2=team2, team_size=3, gamemode="Casual")
+
+        response = await self.async_client.get(reverse("game-events", kwargs={"game_id": game.id}))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b": connected\n\n")
+
+        get_backend().publish(game.id, {"version": 2, "round_number": 1})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertTrue(chunk.startswith(b"id: 2\nevent: round\ndata: "))
+        # Close the view's generator itself so it unsubscribes while this event loop is running
+        await response._iterator.aclose()
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        # The process-wide registry holds every earlier test's requests
+        patcher = mock.patch("tracker.metrics.registry", MetricsRegistry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_metrics_endpoint_reports_requests_by_url_name(self):
+        """/metrics sums every worker's file and labels samples with the URL name."""
+        with tempfile.TemporaryDirectory() as metrics_dir, override_settings(METRICS_DIR=metrics_dir):
+            self.client.get(reverse("game-state", kwargs={"game_id": 999999}))
+            # A second worker's counters
+            with open(os.path.join(metrics_dir, "metrics-1.json"), "w") as metrics_file:
+                json.dump({
+                    "requests": {"team-record|GET|200": 3},
+                    "durations": {"team-record": {"buckets": [3] + [0] * 10, "sum": 0.01, "count": 3}},
+                    "queries": {"team-record": 6},
+                    "db_seconds": {"team-record": 0.002},
+                }, metrics_file)
+
+            response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('tracker_requests_total{view="game-state",method="GET",status="404"} 1', body)
+        self.assertIn('tracker_requests_total{view="team-record",method="GET",status="200"} 3', body)
+        self.assertIn('tracker_request_duration_seconds_bucket{view="team-record",le="+Inf"} 3', body)
+        self.assertIn('tracker_db_queries_total{view="team-record"} 6', body)
+
+
+class GameEventBackendTests(SimpleTestCase):
+    def test_in_process_backend_delivers_across_threads(self):
+        backend = InProcessGameEventBackend()
+
+        async def listen():
+            async with backend.subscribe(7) as events:
+                publisher = threading.Thread(target=backend.publish, args=(7, {"round_number": 1}))
+                publisher.start()
+                event = await asyncio.wait_for(events.get(), 1)
+                publisher.join()
+                return event
+
+        self.assertEqual(asyncio.run(listen()), {"round_number": 1})
+        self.assertEqual(backend._subscribers, {})
+
+    def test_incomplete_backend_fails_when_created(self):
+        class PublishOnlyBackend(GameEventBackend):
+            def publish(self, game_id, event):
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnlyBackend()
+
+
+class CupStateTests(SimpleTestCase):
+    def test_round_trip_through_packed_bytes(self):
+        cups = CupState.parse({"156": "12", "1": 5, "80": 7, "3": ""})
+        packed = cups.to_bytes()
+
+        self.assertEqual(len(packed), 20 + 3 * 4)
+        self.assertEqual(CupState.from_bytes(packed), {"1": 5, "80": 7, "156": 12})
+        self.assertEqual(CupState.from_bytes(CupState().to_bytes()), {})
+
+    def test_rejects_invalid_cups(self):
+        with self.assertRaises(ValueError):
+            CupState.parse({"157": 1})
+        with self.assertRaises(ValueError):
+            CupState.parse({"1": "not-a-player"})
@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import CreateGameView, NewRoundView, GameStateView, AllGamesView, LeaderboardView
+from .views import CreateGameView, NewRoundView, GameStateView, AllGamesView, LeaderboardView, GameEventsView, RoundBatchView, TeamRecordView, PlayerProfileView, GameReplayView, PlayerMatchupView, PlayerPartnersView
 
 
 urlpatterns = [
     path('start-game', CreateGameView.as_view(), name='new-game'),                  # POST
     path("game/<int:game_id>", GameStateView.as_view(), name="game-state"),         # GET
+    path('game/<int:game_id>/at/<int:round_number>', GameReplayView.as_view(), name='game-replay'), # GET
     path('game/<int:game_id>/round', NewRoundView.as_view(), name='new-round'),     # POST
+    path('game/<int:game_id>/rounds:batch', RoundBatchView.as_view(), name='round-batch'), # POST
+    path('game/<int:game_id>/events', GameEventsView.as_view(), name='game-events'), # GET (SSE)
+    path('team/<int:team_id>/record', TeamRecordView.as_view(), name='team-record'), # GET
+    path('player/<int:player_id>', PlayerProfileView.as_view(), name='player-profile'), # GET
+    path('player/<int:player_id>/vs/<int:other_id>', PlayerMatchupView.as_view(), name='player-matchup'), # GET
+    path('player/<int:player_id>/partners', PlayerPartnersView.as_view(), name='player-partners'), # GET
     path('games/', AllGamesView.as_view(), name='game-list'),                       # GET
     path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
 
@@ -1,20 +1,92 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from django.db import transaction
-from .models import User, Team, Game, Round, PlayerStats
-from .serializers import GameStateSerializer, RoundResponseSerializer, GameListSerializer, LeaderboardSerializer
-from django.db.models import Count, Sum, Avg
+from rest_framework.pagination import CursorPagination
+from django.db import transaction, IntegrityError
+from .models import User, Team, Game, Round, PlayerStats, RoundRequest, PlayerCareerStats, ShotEvent, GameSnapshot, PlayerPairStats, apply_rollup_changes
+from .fields import CupState
+from .serializers import GameStateSerializer, GameDeltaSerializer, GameReplaySerializer, RoundResponseSerializer, GameListSerializer, LeaderboardSerializer, TeamRecordSerializer, RollupSerializer, PlayerModeSerializer, PlayerGameSerializer, PairRecordSerializer, PartnerSerializer
+from django.db.models import Q, Prefetch, prefetch_related_objects
 from rest_framework.exceptions import ValidationError
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.core.handlers.asgi import ASGIRequest
+from .events import get_backend
+from .replay import STATS_COUNTERS, classify_cups, snapshot_due, replay
+import asyncio, json
+
+def etag_matches(request, etag):
+    """Check a request's If-None-Match header against the current ETag."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    client_etags = parse_etags(if_none_match)
+    return "*" in client_etags or etag in client_etags
 
 class GameStateView(APIView):
     def get(self, request, game_id):
         try:
-            game = Game.objects.get(pk=game_id)
+            game = Game.objects.select_related("team1", "team2").get(pk=game_id)
         except Game.DoesNotExist:
             return Response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = GameStateSerializer(game)
+        # **Unchanged since the client's last poll**
+        etag = quote_etag(f"{game.pk}-{game.version}")
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        # **Reconnecting clients only need what changed after the last round they saw**
+        since_round = request.query_params.get("since_round")
+        if since_round is not None:
+            try:
+                since_round = int(since_round)
+            except ValueError:
+                return Response({"error": "since_round must be a round number."}, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = GameDeltaSerializer(game, context={
+                "rounds": list(game.rounds.filter(round_number__gt=since_round).order_by("round_number")),
+                "player_stats": list(game.game_stats.filter(last_round__gt=since_round).select_related("player")),
+            })
+            return Response(serializer.data, status=status.HTTP_200_OK, headers=headers)
+
+        # **Serialized states are immutable per version, so they can be shared between pollers**
+        cache_key = f"game-state:{game.pk}:{game.version}"
+        data = cache.get(cache_key)
+        if data is None:
+            prefetch_related_objects(
+                [game], Prefetch("game_stats", queryset=PlayerStats.objects.select_related("player"))
+            )
+            data = GameStateSerializer(game).data
+            cache.set(cache_key, data)
+
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+class GameReplayView(APIView):
+    """Game state as it was right after a given round, for reviewing disputed calls."""
+
+    def get(self, request, game_id, round_number):
+        try:
+            game = Game.objects.select_related("team1", "team2").get(pk=game_id)
+        except Game.DoesNotExist:
+            return Response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # **Nearest snapshot plus the rounds after it**
+        state = replay(game, round_number)
+        if state is None:
+            return Response({"error": "Round not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        state.to_game(game)  # Not saved
+        player_stats = state.player_stats(game)
+        users = User.objects.in_bulk([stats.player_id for stats in player_stats])
+        for stats in player_stats:
+            stats.player = users[stats.player_id]
+
+        serializer = GameReplaySerializer(game, context={"round_number": round_number, "player_stats": player_stats})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class CreateGameView(APIView):    
@@ -29,6 +101,11 @@ class CreateGameView(APIView):
         if not gamemode or not team_size:
             return Response({"error": "Game mode and team size are required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Teams have three required player slots and six in all
+        team_sizes = [size for size, _ in Game._meta.get_field("team_size").choices]
+        if team_size not in team_sizes:
+            return Response({"error": f"Team size must be one of {team_sizes}."}, status=status.HTTP_400_BAD_REQUEST)
+
         # Extract teams
         teams_data = data.get("teams", {})
         team1_data = teams_data.get("team1")
@@ -38,12 +115,28 @@ class CreateGameView(APIView):
             return Response({"error": "Both teams must be provided."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
+            # Resolve every requested player in one query, keeping the requested slot order
+            team1_players = self.requested_players(team1_data, team_size)
+            team2_players = self.requested_players(team2_data, team_size)
+            if set(team1_players) & set(team2_players):
+                raise ValidationError("A player cannot be on both teams.")
+
+            users = User.objects.in_bulk(team1_players + team2_players)
+            if len(users) != len(team1_players + team2_players):
+                raise ValidationError("Some provided player IDs do not exist.")
+
             with transaction.atomic():
+                # Reuse the Team rows of lineups that have played before
+                roster_hashes = [Team.hash_roster(team1_players), Team.hash_roster(team2_players)]
+                existing_teams = {}
+                for team in Team.objects.filter(roster_hash__in=roster_hashes).order_by("-id"):
+                    existing_teams[team.roster_hash] = team  # Oldest row wins
+
                 # Create Team 1
-                team1 = self.create_team(team1_data, team_size)
+                team1 = self.get_or_create_team(existing_teams.get(roster_hashes[0]), team1_data["name"], [users[pk] for pk in team1_players])
 
                 # Create Team 2
-                team2 = self.create_team(team2_data, team_size)
+                team2 = self.get_or_create_team(existing_teams.get(roster_hashes[1]), team2_data["name"], [users[pk] for pk in team2_players])
 
                 # Create Game
                 game = Game.objects.create(
@@ -53,20 +146,25 @@ class CreateGameView(APIView):
                     gamemode=gamemode
                 )
 
-                # Initialize PlayerStats for all players
-                all_players = [team1.player1, team1.player2, team1.player3, team1.player4, team1.player5, team1.player6,
-                               team2.player1, team2.player2, team2.player3, team2.player4, team2.player5, team2.player6]
+                # Initialize PlayerStats for all players in one insert
+                all_stats = [PlayerStats(player=users[pk], game=game) for pk in team1_players + team2_players]
+                for player_stats in all_stats:
+                    player_stats.score = player_stats.calculate_score()
+                PlayerStats.objects.bulk_create(all_stats)
 
-                for player in filter(None, all_players):  # Remove `None` values
-                    PlayerStats.objects.create(player=player, game=game)
+                # Count the new game in each player's career and gamemode rollups
+                apply_rollup_changes({
+                    player_stats.player_id: {"games_played": 1, **player_stats.career_values()}
+                    for player_stats in all_stats
+                }, gamemode)
 
             return Response({"message": "Game created successfully", "game_id": game.id}, status=status.HTTP_201_CREATED)
 
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def create_team(self, team_data, team_size):
-        """Helper function to create a team."""
+    def requested_players(self, team_data, team_size):
+        """Validate a team's payload and return its player ids in slot order."""
         team_name = team_data.get("name")
         player_pks = team_data.get("players", [])
 
@@ -76,183 +174,522 @@ class CreateGameView(APIView):
         if len(player_pks) != team_size:
             raise ValidationError(f"Team must have exactly {team_size} players.")
 
-        players = list(User.objects.filter(pk__in=player_pks))
-        if len(players) != team_size:
+        try:
+            player_pks = [int(pk) for pk in player_pks]
+        except (TypeError, ValueError):
             raise ValidationError("Some provided player IDs do not exist.")
 
-        # Create the team and assign players dynamically
-        team = Team.objects.create(team_name=team_name, player1=players[0], player2=players[1], player3=players[2])
+        if len(set(player_pks)) != len(player_pks):
+            raise ValidationError("Some provided player IDs do not exist.")
+
+        return player_pks
+
+    def get_or_create_team(self, team, team_name, players):
+        """
+        Reuse a lineup's existing team or create it in a single insert. A reused team keeps the name
+        it was created with, since renaming the shared row would rename it on every earlier game.
+        """
+        if team is not None:
+            return team
+
+        slots = {f"player{slot}": player for slot, player in enumerate(players, start=1)}
+        return Team.objects.create(team_name=team_name, **slots)
+
+class TeamRecordView(APIView):
+    """Precomputed win/loss record of a lineup."""
 
-        if team_size >= 4:
-            team.player4 = players[3]
-        if team_size >= 5:
-            team.player5 = players[4]
-        if team_size == 6:
-            team.player6 = players[5]
+    def get(self, request, team_id):
+        try:
+            team = Team.objects.get(pk=team_id)
+        except Team.DoesNotExist:
+            return Response({"error": "Team not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(TeamRecordSerializer(team).data, status=status.HTTP_200_OK)
 
-        team.save()
-        return team
+class GameCursorPagination(CursorPagination):
+    """Newest games first, resumed from an opaque (created_at, id) cursor."""
+    ordering = ("-created_at", "-id")
+    page_size = 25
+    page_size_query_param = "limit"
+    max_page_size = 100
 
 class AllGamesView(generics.ListAPIView):
-    """Retrieve a list of all games."""
-    queryset = Game.objects.all()
+    """Retrieve a page of games, optionally filtered by status and gamemode."""
     serializer_class = GameListSerializer
+    pagination_class = GameCursorPagination
+
+    def get_queryset(self):
+        queryset = Game.objects.select_related("team1", "team2", "winner")
+
+        game_status = self.request.query_params.get("status")
+        if game_status:
+            queryset = queryset.filter(status=game_status)
+
+        gamemode = self.request.query_params.get("gamemode")
+        if gamemode:
+            queryset = queryset.filter(gamemode=gamemode)
+
+        return queryset
+
+class RoundIngestion:
+    """Applies rounds to a locked game in memory, then writes them back in a fixed number of queries."""
+    # PlayerStats columns a round can change
+    STATS_FIELDS = ["shots_taken", "cups_made", "own_cups", "death_cups", "clutch_cups", "score", "last_round"]
+
+    @staticmethod
+    def lock_game(game_id):
+        """Load the game with its teams and PlayerStats, locking its row until commit."""
+        return (
+            Game.objects
+            .select_for_update(of=("self",))
+            .select_related("team1", "team2")
+            .prefetch_related(Prefetch("game_stats", queryset=PlayerStats.objects.select_related("player")))
+            .get(pk=game_id)
+        )
 
-class NewRoundView(APIView):
-    def post(self, request, game_id):
-        # Extract & Validate Game Data
-        try:
-            game = Game.objects.get(pk=game_id)
-        except Game.DoesNotExist:
-            return Response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+    @staticmethod
+    def parse_round(gamestate, existing_cups):
+        """Validate one round's cups against the cups already hit.
 
-        # **Update game status if this is the first round**
-        if game.status == "Not-Started":
-            game.status = "In-Progress"
-            
-        # Make sure the game is not completed
-        if game.status == "Completed":
-            return Response({"error": "Game is already completed."}, status=status.HTTP_400_BAD_REQUEST)
+        Returns (cups, deathcups, error) where error is a response body or None.
+        """
+        if not isinstance(gamestate, dict):
+            return None, None, {"error": "A gamestate object is required."}
 
-        # Extract & Validate Cup Data
-        data = request.data
-        cups = data.get('gamestate', {}).get('cups', {})  # {cup_number: player_id}
-        deathcups = data.get('gamestate', {}).get('deathcups', [])  # {cup_number: player_id}
+        cups = gamestate.get('cups', {})  # {cup_number: player_id}
+        deathcups = gamestate.get('deathcups', [])  # [player_id]
+
+        try:
+            cups = CupState.parse(cups)
+        except (AttributeError, ValueError):
+            return None, None, {"error": "Invalid cup data. Cups must be numbered 1-156 and map to player IDs."}
 
         if not cups:
-            return Response({"error": "Cup data is required."}, status=status.HTTP_400_BAD_REQUEST)
+            return None, None, {"error": "Cup data is required."}
 
         # **Check for duplicate cups already hit**
-        existing_cups = game.cups
-        duplicate_cups = [cup for cup in cups.keys() if cup in existing_cups and existing_cups[cup] != ""]
-
+        duplicate_cups = [cup for cup in cups.keys() if cup in existing_cups]
         if duplicate_cups:
-            return Response({
+            return None, None, {
                 "error": "Invalid cup data. Some cups were already hit.",
                 "duplicate_cups": duplicate_cups
-            }, status=status.HTTP_400_BAD_REQUEST)
+            }
+
+        if not isinstance(deathcups, list):
+            return None, None, {"error": "Invalid death cup data. Deathcups must be a list of player IDs."}
+        player_ids = [RoundIngestion.parse_player_id(player_id) for player_id in deathcups]
+        if None in player_ids:
+            return None, None, {"error": "Invalid death cup data. Deathcups must be a list of player IDs."}
+
+        return cups, player_ids, None
+
+    def __init__(self, game):
+        self.game = game
+        self.roster = game.roster
+        self.rounds = []
+        self.events = []  # ShotEvents for every applied round
+        self.snapshots = []
+
+        # **Ensure PlayerStats exists for all players**
+        self.stats_by_player = {stat.player_id: stat for stat in game.game_stats.all()}
+        self.missing_ids = self.roster.player_ids - self.stats_by_player.keys()
+        if self.missing_ids:
+            missing_stats = [PlayerStats(player=player, game=game) for player in User.objects.filter(pk__in=self.missing_ids)]
+            PlayerStats.objects.bulk_create(missing_stats)
+            self.stats_by_player.update({stat.player_id: stat for stat in missing_stats})
+        self.career_before = {player_id: stat.career_values() for player_id, stat in self.stats_by_player.items()}
 
         # Get the next round number
         last_round = Round.objects.filter(game=game).order_by('-round_number').first()
-        next_round_number = last_round.round_number + 1 if last_round else 1  # Start from 1 if no rounds exist
+        self.next_round_number = last_round.round_number + 1 if last_round else 1  # Start from 1 if no rounds exist
 
-        # **Append New Cup Hits to Game State**
-        updated_cups = game.cups.copy()
-        updated_cups.update(cups)
-        game.cups = updated_cups
-        
-        # **Ensure PlayerStats exists for all players**
-        all_players = [
-            game.team1.player1, game.team1.player2, game.team1.player3,
-            game.team1.player4, game.team1.player5, game.team1.player6,
-            game.team2.player1, game.team2.player2, game.team2.player3,
-            game.team2.player4, game.team2.player5, game.team2.player6
-        ]
-        all_players = [player for player in all_players if player is not None]
-
-        for player in all_players:
-            player_stats, _ = PlayerStats.objects.get_or_create(player=player, game=game)
-            player_stats.shots_taken += 1
-            player_stats.save()
+    def apply(self, cups, deathcups):
+        """Fold one validated round into the game and player stats, returning its unsaved Round."""
+        game = self.game
+        round_number = self.next_round_number
+        self.next_round_number += 1
+
+        # **Append New Cup Hits to Game State and team counters**
+        game.apply_cups(cups)
+        game.check_winner()
+
+        for player_id in self.roster.player_ids:
+            self.stats_by_player[player_id].shots_taken += 1
 
         # **Process Individual Player Stats (Only If They Hit a Cup)**
-        teamA_cup_hitters = []
-        teamB_cup_hitters = []
-        
-        for cup, player_id in cups.items():
-            try:
-                player = User.objects.get(pk=player_id)
-                player_stats, _ = PlayerStats.objects.get_or_create(player=player, game=game)
-
-                if int(cup) < 79:
-                    # Cup belongs to Team A, so the shooter must be on Team B
-                    if player in [
-                        game.team2.player1, game.team2.player2, game.team2.player3,
-                        game.team2.player4, game.team2.player5, game.team2.player6
-                    ]:
-                        player_stats.cups_made += 1
-                        teamB_cup_hitters.append(player)
-                    else:
-                        player_stats.own_cups += 1
-                elif int(cup) > 78:
-                    # Cup belongs to Team B, so the shooter must be on Team A
-                    if player in [
-                        game.team1.player1, game.team1.player2, game.team1.player3,
-                        game.team1.player4, game.team1.player5, game.team1.player6
-                    ]:
-                        player_stats.cups_made += 1
-                        teamA_cup_hitters.append(player)
-                    else:
-                        player_stats.own_cups += 1
-
-                player_stats.save()
-
-            except User.DoesNotExist:
+        for shot in classify_cups(self.roster, cups):
+            self.events.append(ShotEvent(
+                game=game, round_number=round_number, cup=shot.cup, shooter_id=shot.shooter_id,
+                side=shot.side or "", is_own_cup=shot.is_own_cup, is_clutch=shot.is_clutch,
+            ))
+
+            player_stats = self.stats_by_player.get(shot.shooter_id)
+            if player_stats is None:
                 continue  # Ignore invalid player IDs
-            
-        # Check for clutch shots
-        if len(teamA_cup_hitters) == 1:
-            solo_shooter = teamA_cup_hitters[0]
-            solo_shooter_stats = PlayerStats.objects.get(player=solo_shooter, game=game)
-            solo_shooter_stats.clutch_cups += 1
-            solo_shooter_stats.save()
-            
-        if len(teamB_cup_hitters) == 1:
-            solo_shooter = teamB_cup_hitters[0]
-            solo_shooter_stats = PlayerStats.objects.get(player=solo_shooter, game=game)
-            solo_shooter_stats.clutch_cups += 1
-            solo_shooter_stats.save()
-            
+
+            if shot.is_own_cup:
+                player_stats.own_cups += 1
+            else:
+                player_stats.cups_made += 1
+            if shot.is_clutch:
+                player_stats.clutch_cups += 1
+
         # Check for death cup
-        if deathcups:
-            for player_id in deathcups:
-                try:
-                    player = User.objects.get(pk=player_id)
-                    player_stats, _ = PlayerStats.objects.get_or_create(player=player, game=game)
-                    player_stats.death_cups += 1
-                    player_stats.save()
-                except User.DoesNotExist:
-                    continue
-            
-        # Create a new round record
-        new_round = Round.objects.create(
+        for player_id in deathcups:
+            player_stats = self.stats_by_player.get(player_id)
+            if player_stats is not None:
+                player_stats.death_cups += 1
+                self.events.append(ShotEvent(
+                    game=game, round_number=round_number, shooter_id=player_id,
+                    side=self.roster.side_of(player_id) or "", is_death=True,
+                ))
+
+        # **Re-score every player against the updated team counters**
+        for player_stats in self.stats_by_player.values():
+            player_stats.score = player_stats.calculate_score()
+            player_stats.last_round = round_number
+
+        # Checkpoint for replays (games/replay.py)
+        if snapshot_due(round_number):
+            self.snapshots.append(GameSnapshot(
+                game=game,
+                round_number=round_number,
+                cups=CupState(game.cups),
+                stats={
+                    str(player_id): [getattr(player_stats, field) for field in STATS_COUNTERS]
+                    for player_id, player_stats in self.stats_by_player.items()
+                },
+            ))
+
+        new_round = Round(
             game=game,
-            round_number=next_round_number,
+            round_number=round_number,
             cups=cups,
             teamA_rack_status=game.teamA_rack_status,
             teamB_rack_status=game.teamB_rack_status
         )
+        self.rounds.append(new_round)
+        return new_round
+
+    def serialize(self, game_round):
+        """Round response reflecting the in-memory state right after that round."""
+        stats = list(self.stats_by_player.values())
+        return RoundResponseSerializer(game_round, context={"player_stats": stats}).data
+
+    def save(self, responses):
+        """Write the applied rounds, their shot events, game and stats back, and queue their live events."""
+        game = self.game
+        Round.objects.bulk_create(self.rounds)
+        ShotEvent.objects.bulk_create(self.events)
+        if self.snapshots:
+            GameSnapshot.objects.bulk_create(self.snapshots)
 
         # Save the updated game state
-        game.save() # updates status
-        
-        # **Use Serializer to Build Response Data**
-        serializer = RoundResponseSerializer(new_round)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        game.save() # updates status and version
+
+        touched_stats = list(self.stats_by_player.values())
+        PlayerStats.objects.bulk_update(touched_stats, self.STATS_FIELDS)
+
+        # **Roll the stat changes into each player's career totals and gamemode split**
+        career_changes = {}
+        for player_stats in touched_stats:
+            before = self.career_before[player_stats.player_id]
+            after = player_stats.career_values()
+            career_changes[player_stats.player_id] = {field: after[field] - before[field] for field in after}
+            if player_stats.player_id in self.missing_ids:
+                career_changes[player_stats.player_id]["games_played"] = 1
+        apply_rollup_changes(career_changes, game.gamemode)
+
+        # **Push the round deltas to live spectators once they are committed**
+        events = [{"game_id": game.pk, "version": game.version, **response} for response in responses]
+        transaction.on_commit(lambda: [get_backend().publish(game.pk, event) for event in events])
+
+    @staticmethod
+    def parse_player_id(player_id):
+        """Normalize a player id sent by the client, returning None if it is not a valid id."""
+        try:
+            return int(player_id)
+        except (TypeError, ValueError):
+            return None
+
+class NewRoundView(APIView):
+    def post(self, request, game_id):
+        idempotency_key = request.headers.get("Idempotency-Key")
+
+        try:
+            return self.apply_round(request, game_id, idempotency_key)
+        except IntegrityError:
+            # Another scorekeeper committed the same round number first
+            return Response({"error": "Round conflicts with a concurrent update, please retry."}, status=status.HTTP_409_CONFLICT)
+
+    def apply_round(self, request, game_id, idempotency_key):
+        with transaction.atomic():
+            # Extract & Validate Game Data (teams and PlayerStats in one pass)
+            # The game row stays locked until commit so concurrent rounds are applied one at a time
+            try:
+                game = RoundIngestion.lock_game(game_id)
+            except Game.DoesNotExist:
+                return Response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            # **Replay the stored response if this round was already applied**
+            if idempotency_key:
+                previous = RoundRequest.objects.filter(game=game, key=idempotency_key).first()
+                if previous is not None:
+                    return Response(previous.response, status=previous.status_code)
+
+            # **Update game status if this is the first round**
+            if game.status == "Not-Started":
+                game.status = "In-Progress"
+
+            # Make sure the game is not completed
+            if game.status == "Completed":
+                return Response({"error": "Game is already completed."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Extract & Validate Cup Data
+            gamestate = request.data.get('gamestate', {}) if isinstance(request.data, dict) else None
+            cups, deathcups, error = RoundIngestion.parse_round(gamestate, game.cups)
+            if error:
+                return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+            ingestion = RoundIngestion(game)
+            new_round = ingestion.apply(cups, deathcups)
+
+            # **Use Serializer to Build Response Data**
+            response_data = ingestion.serialize(new_round)
+            ingestion.save([response_data])
+
+            if idempotency_key:
+                RoundRequest.objects.create(
+                    game=game, key=idempotency_key, status_code=status.HTTP_201_CREATED, response=response_data
+                )
+
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+class RoundBatchView(APIView):
+    """Apply an ordered backlog of rounds recorded offline in a single transaction."""
+
+    def post(self, request, game_id):
+        rounds_data = request.data.get("rounds") if isinstance(request.data, dict) else None
+        if not isinstance(rounds_data, list) or not rounds_data:
+            return Response({"error": "A non-empty list of rounds is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                try:
+                    game = RoundIngestion.lock_game(game_id)
+                except Game.DoesNotExist:
+                    return Response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+
+                # **Replay the stored response if this backlog was already synced**
+                idempotency_key = request.headers.get("Idempotency-Key")
+                if idempotency_key:
+                    previous = RoundRequest.objects.filter(game=game, key=idempotency_key).first()
+                    if previous is not None:
+                        return Response(previous.response, status=previous.status_code)
+
+                if game.status == "Completed":
+                    return Response({"error": "Game is already completed."}, status=status.HTTP_400_BAD_REQUEST)
+
+                # **Validate every round against the board before applying any of them**
+                parsed_rounds = []
+                errors = []
+                board = set(game.cups)
+                for index, round_data in enumerate(rounds_data):
+                    gamestate = round_data.get("gamestate", {}) if isinstance(round_data, dict) else None
+                    if not isinstance(gamestate, dict):
+                        errors.append({"index": index, "error": "Each round needs a gamestate object."})
+                        continue
+                    cups, deathcups, error = RoundIngestion.parse_round(gamestate, board)
+                    if error:
+                        errors.append({"index": index, **error})
+                        continue
+                    board.update(cups)
+                    parsed_rounds.append((cups, deathcups))
+
+                if errors:
+                    return Response({"error": "Invalid rounds, nothing was applied.", "rounds": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+                # **Update game status if this is the first round**
+                if game.status == "Not-Started":
+                    game.status = "In-Progress"
+
+                ingestion = RoundIngestion(game)
+                results = []
+                for index, (cups, deathcups) in enumerate(parsed_rounds):
+                    if game.status == "Completed":
+                        transaction.set_rollback(True)
+                        return Response({
+                            "error": "Game was completed before this round, nothing was applied.",
+                            "rounds": [{"index": index, "error": "Game is already completed."}]
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                    results.append(ingestion.serialize(ingestion.apply(cups, deathcups)))
+
+                ingestion.save(results)
+
+                if idempotency_key:
+                    RoundRequest.objects.create(
+                        game=game, key=idempotency_key, status_code=status.HTTP_201_CREATED, response={"rounds": results}
+                    )
+
+        except IntegrityError:
+            return Response({"error": "Rounds conflict with a concurrent update, please retry."}, status=status.HTTP_409_CONFLICT)
+
+        return Response({"rounds": results}, status=status.HTTP_201_CREATED)
+
+class GameEventsView(View):
+    """Server-sent events stream of round deltas for a live game (serve through tracker.asgi)."""
+
+    async def get(self, request, game_id):
+        # A WSGI worker would buffer this endless stream and stay blocked without sending a byte
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"error": "Live events are only served by the ASGI app (tracker.asgi)."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        if not await Game.objects.filter(pk=game_id).aexists():
+            return JsonResponse({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(self.stream(game_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Keep proxies from buffering the stream
+        return response
+
+    async def stream(self, game_id):
+        async with get_backend().subscribe(game_id) as events:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), settings.GAME_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"  # Comment line keeps idle connections open
+                    continue
+                data = json.dumps(event, cls=DjangoJSONEncoder, separators=(",", ":"))
+                yield f"id: {event['version']}\nevent: round\ndata: {data}\n\n"
 
 class LeaderboardView(APIView):
-    """Leaderboard view that aggregates player stats across all games."""
+    """Leaderboard view that reads the per-player career rollup, one keyset page at a time."""
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
 
     def get(self, request):
-        # Aggregate player stats across all games
-        leaderboard_data = (
-            PlayerStats.objects
-            .values("player")  # Group by player ID
-            .annotate(
-                games_played=Count("game", distinct=True),
-                total_cups_made=Sum("cups_made"),
-                average_accuracy=Avg("accuracy"),
-                total_death_cups=Sum("death_cups"),
-                average_rating=Avg("score")
+        params = request.query_params
+        try:
+            limit = min(int(params.get("limit", self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            after_rating = params.get("after_rating")
+            after_rating = float(after_rating) if after_rating is not None else None
+            after_id = int(params.get("after_id", 0))
+        except ValueError:
+            return Response({"error": "limit, after_rating and after_id must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if limit < 1:
+            return Response({"error": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Career totals are maintained as games are created and rounds are played
+        leaderboard_data = PlayerCareerStats.objects.filter(games_played__gt=0)
+
+        # **Keyset pagination: resume after the last (rating, player) pair the client saw**
+        if after_rating is not None:
+            leaderboard_data = leaderboard_data.filter(
+                Q(average_rating__lt=after_rating) | Q(average_rating=after_rating, player__gt=after_id)
             )
-            .order_by("-average_rating")  # Sort by highest rating
-        )
 
-        # Replace player ID with username
-        for entry in leaderboard_data:
-            entry["player_name"] = User.objects.get(id=entry["player"]).username  # Get player name
-            del entry["player"]  # Remove the ID field
+        leaderboard_data = (
+            leaderboard_data
+            .order_by("-average_rating", "player")  # Sort by highest rating
+            .values(
+                "player", "player__username", "games_played", "total_cups_made",
+                "average_accuracy", "total_death_cups", "average_rating"
+            )[:limit]
+        )
 
         # Serialize and return response
         serializer = LeaderboardSerializer(leaderboard_data, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class PlayerProfileView(APIView):
+    """Career profile served from the player's rollups plus a few index-backed PlayerStats lookups."""
+    DEFAULT_RECENT = 5
+    MAX_RECENT = 50
+
+    def get(self, request, player_id):
+        try:
+            recent = min(int(request.query_params.get("recent", self.DEFAULT_RECENT)), self.MAX_RECENT)
+        except ValueError:
+            return Response({"error": "recent must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if recent < 1:
+            return Response({"error": "recent must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        player = User.objects.select_related("career_stats").filter(pk=player_id).first()
+        if player is None:
+            return Response({"error": "Player not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            career = player.career_stats
+        except PlayerCareerStats.DoesNotExist:
+            career = PlayerCareerStats(player=player)  # Never played
+
+        # **Per-game rows, read through the (player, game) index**
+        player_games = PlayerStats.objects.filter(player=player).select_related("game__team1", "game__team2")
+        recent_games = list(player_games.order_by("-game")[:recent])
+        completed = player_games.filter(game__status="Completed")
+        best = completed.order_by("-score", "-game").first()
+        worst = completed.order_by("score", "-game").first()
+
+        recent_results = [PlayerGameSerializer(stats).data for stats in recent_games]
+        return Response({
+            "player_id": player.id,
+            "player_name": player.username,
+            "career": RollupSerializer(career).data,
+            "gamemodes": PlayerModeSerializer(player.mode_stats.order_by("gamemode"), many=True).data,
+            "recent_form": {
+                "games": recent_results,
+                "wins": sum(1 for game in recent_results if game["result"] == "W"),
+                "losses": sum(1 for game in recent_results if game["result"] == "L"),
+                "average_rating": (
+                    round(sum(float(stats.score) for stats in recent_games) / len(recent_games), 2) if recent_games else None
+                ),
+            },
+            "best_rating": PlayerGameSerializer(best).data if best else None,
+            "worst_rating": PlayerGameSerializer(worst).data if worst else None,
+        }, status=status.HTTP_200_OK)
+
+class PlayerMatchupView(APIView):
+    """Head-to-head record of two players, with and against each other, from the pair index."""
+
+    def get(self, request, player_id, other_id):
+        records = {
+            pair["relation"]: pair
+            for pair in PlayerPairStats.objects.filter(player_id=player_id, other_id=other_id)
+            .values("relation", *PlayerPairStats.RECORD_FIELDS)
+        }
+        empty = dict.fromkeys(PlayerPairStats.RECORD_FIELDS, 0)
+        return Response({
+            "player_id": player_id,
+            "other_id": other_id,
+            "opponent": PairRecordSerializer(records.get("opponent", empty)).data,
+            "teammate": PairRecordSerializer(records.get("teammate", empty)).data,
+        }, status=status.HTTP_200_OK)
+
+class PlayerPartnersView(APIView):
+    """A player's teammates, most shared completed games first."""
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    def get(self, request, player_id):
+        try:
+            limit = min(int(request.query_params.get("limit", self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if limit < 1:
+            return Response({"error": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        partners = (
+            PlayerPairStats.objects
+            .filter(player_id=player_id, relation="teammate")
+            .order_by("-games", "other")  # Served by pair_by_games_idx
+            .values("other", "other__username", *PlayerPairStats.RECORD_FIELDS)[:limit]
+        )
+        return Response(PartnerSerializer(partners, many=True).data, status=status.HTTP_200_OK)
@@ -0,0 +1,181 @@
+"""
+Per-endpoint request metrics (count, latency, DB queries and DB time) in Prometheus text format.
+
+Each worker process accumulates its own counters in memory and periodically writes them to
+METRICS_DIR/metrics-<pid>.json; the /metrics view sums the files of every worker, so the
+numbers cover all gunicorn workers regardless of which one serves the scrape.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """In-process counters, flushed to this worker's file in METRICS_DIR."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # "view|method|status" -> count
+        self.durations = {}  # view -> {"buckets": [...], "sum": seconds, "count": n}
+        self.queries = {}  # view -> DB queries
+        self.db_seconds = {}  # view -> seconds spent in the DB
+        self.last_flush = 0.0
+
+    def observe(self, view, method, status_code, seconds, query_count, db_seconds):
+        with self.lock:
+            key = f"{view}|{method}|{status_code}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            duration = self.durations.get(view)
+            if duration is None:
+                duration = self.durations[view] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    duration["buckets"][index] += 1
+                    break
+            duration["sum"] += seconds
+            duration["count"] += 1
+
+            self.queries[view] = self.queries.get(view, 0) + query_count
+            self.db_seconds[view] = self.db_seconds.get(view, 0.0) + db_seconds
+
+        if time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({
+                "requests": self.requests,
+                "durations": self.durations,
+                "queries": self.queries,
+                "db_seconds": self.db_seconds,
+            }))
+
+    def flush(self):
+        """Atomically replace this worker's metrics file with the current counters."""
+        self.last_flush = time.monotonic()
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as metrics_file:
+            json.dump(self.snapshot(), metrics_file)
+        os.replace(temporary_path, path)
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """connection.execute_wrapper hook counting queries and the time spent running them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Record count, latency, DB queries and DB time for every request, by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        queries = QueryTimer()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        registry.observe(
+            view, request.method, response.status_code, time.perf_counter() - started, queries.count, queries.seconds
+        )
+        return response
+
+
+def collect():
+    """Sum the metrics files written by every worker."""
+    registry.flush()
+    totals = {"requests": {}, "durations": {}, "queries": {}, "db_seconds": {}}
+    directory = settings.METRICS_DIR
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as metrics_file:
+                worker = json.load(metrics_file)
+        except (OSError, ValueError):
+            continue  # Being replaced or unreadable, skip this scrape
+
+        for section in ("requests", "queries", "db_seconds"):
+            for key, value in worker[section].items():
+                totals[section][key] = totals[section].get(key, 0) + value
+        for view, duration in worker["durations"].items():
+            total = totals["durations"].setdefault(view, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], duration["buckets"])]
+            total["sum"] += duration["sum"]
+            total["count"] += duration["count"]
+    return totals
+
+
+def render(totals):
+    """Format summed metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP tracker_requests_total Requests handled, by URL name, method and status code.",
+        "# TYPE tracker_requests_total counter",
+    ]
+    for key, count in sorted(totals["requests"].items()):
+        view, method, status_code = key.split("|")
+        lines.append(f'tracker_requests_total{{view="{view}",method="{method}",status="{status_code}"}} {count}')
+
+    lines += [
+        "# HELP tracker_request_duration_seconds Request latency, by URL name.",
+        "# TYPE tracker_request_duration_seconds histogram",
+    ]
+    for view, duration in sorted(totals["durations"].items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, duration["buckets"]):
+            cumulative += count
+            lines.append(f'tracker_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+        lines.append(f'tracker_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {duration["count"]}')
+        lines.append(f'tracker_request_duration_seconds_sum{{view="{view}"}} {duration["sum"]}')
+        lines.append(f'tracker_request_duration_seconds_count{{view="{view}"}} {duration["count"]}')
+
+    lines += [
+        "# HELP tracker_db_queries_total Database queries run while handling requests, by URL name.",
+        "# TYPE tracker_db_queries_total counter",
+    ]
+    for view, count in sorted(totals["queries"].items()):
+        lines.append(f'tracker_db_queries_total{{view="{view}"}} {count}')
+
+    lines += [
+        "# HELP tracker_db_query_seconds_total Time spent in database queries, by URL name.",
+        "# TYPE tracker_db_query_seconds_total counter",
+    ]
+    for view, seconds in sorted(totals["db_seconds"].items()):
+        lines.append(f'tracker_db_query_seconds_total{{view="{view}"}} {seconds}')
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, optionally protected by METRICS_TOKEN."""
+    if settings.METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
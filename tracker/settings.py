@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from environs import Env
 
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -95,6 +97,62 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local-memory entries are evicted least-recently-used first; culling one entry at a
+# time (CULL_FREQUENCY == MAX_ENTRIES) keeps the rest of the hot game states cached.
+
+GAME_STATE_CACHE_ENTRIES = env.int("GAME_STATE_CACHE_ENTRIES", default=1000)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tracker",
+        "OPTIONS": {
+            "MAX_ENTRIES": GAME_STATE_CACHE_ENTRIES,
+            "CULL_FREQUENCY": GAME_STATE_CACHE_ENTRIES,
+        },
+    }
+}
+
+
+# Live game events (games/events.py)
+# The in-process backend only reaches spectators connected to the same worker, which is why the
+# Procfile pins a single worker; more workers need a backend that relays through a shared broker.
+
+GAME_EVENTS_BACKEND = env.str("GAME_EVENTS_BACKEND", default="games.events.InProcessGameEventBackend")
+GAME_EVENTS_KEEPALIVE = env.int("GAME_EVENTS_KEEPALIVE", default=15)
+
+
+# Game replays (games/replay.py)
+# A snapshot is stored every GAME_SNAPSHOT_INTERVAL rounds, so replaying any round folds at most
+# that many rounds minus one.
+
+GAME_SNAPSHOT_INTERVAL = env.int("GAME_SNAPSHOT_INTERVAL", default=10)
+
+
+# API authentication (users/authentication.py)
+# Endpoints stay open to anonymous requests; a valid token identifies request.user.
+# Resolved users are cached per worker for JWT_USER_CACHE_TTL seconds, keyed by (user id, iat).
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": ["users.authentication.JWTAuthentication"],
+    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.AllowAny"],
+}
+
+JWT_USER_CACHE_TTL = env.int("JWT_USER_CACHE_TTL", default=60)
+JWT_USER_CACHE_SIZE = env.int("JWT_USER_CACHE_SIZE", default=1024)
+
+
+# Request metrics (tracker/metrics.py)
+# Every worker writes its counters to METRICS_DIR, which must be shared by all workers of
+# one deployment; /metrics sums them. Set METRICS_TOKEN to require a bearer token to scrape.
+
+METRICS_DIR = env.str("METRICS_DIR", default=os.path.join(tempfile.gettempdir(), "tracker-metrics"))
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=5.0)
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
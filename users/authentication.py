@@ -0,0 +1,187 @@
+import datetime
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import authentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import User, RefreshToken
+
+ACCESS_TOKEN_LIFETIME = datetime.timedelta(minutes=60)
+REFRESH_TOKEN_LIFETIME = datetime.timedelta(days=30)
+
+
+def create_access_token(user):
+    """Signed JWT identifying `user`, as issued by LoginView."""
+    now = timezone.now()
+    payload = {
+        'id': user.id,
+        'type': 'access',
+        'exp': now + ACCESS_TOKEN_LIFETIME,
+        'iat': now,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def create_refresh_token(user, family=None):
+    """Record and sign a refresh token; rotations pass the family of the token they replace."""
+    now = timezone.now()
+    record = RefreshToken.objects.create(
+        jti=uuid.uuid4().hex,
+        family=family or uuid.uuid4().hex,
+        user=user,
+        expires_at=now + REFRESH_TOKEN_LIFETIME,
+    )
+    payload = {
+        'id': user.id,
+        'type': 'refresh',
+        'jti': record.jti,
+        'exp': record.expires_at,
+        'iat': now,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def decode_refresh_token(token):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'], options={'require': ['exp', 'jti']})
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationFailed('Refresh token expired.')
+    except jwt.InvalidTokenError:
+        raise AuthenticationFailed('Invalid refresh token.')
+    if payload.get('type') != 'refresh':
+        raise AuthenticationFailed('Invalid refresh token.')
+    return payload
+
+
+def rotate_refresh_token(token):
+    """
+    Exchange a refresh token for a new access token and refresh token without checking the password.
+    Reusing an already rotated token revokes its whole family, logging out whoever holds the newer one.
+    """
+    payload = decode_refresh_token(token)
+    now = timezone.now()
+    reused = False
+    with transaction.atomic():
+        record = RefreshToken.objects.select_for_update().select_related('user').filter(jti=payload['jti']).first()
+        if record is None or record.expires_at <= now or not record.user.is_active:
+            raise AuthenticationFailed('Invalid refresh token.')
+        if record.revoked_at is not None:
+            RefreshToken.objects.filter(family=record.family, revoked_at__isnull=True).update(revoked_at=now)
+            reused = True
+        else:
+            record.revoked_at = now
+            record.save(update_fields=['revoked_at'])
+            refresh = create_refresh_token(record.user, family=record.family)
+    if reused:
+        # Raised outside the atomic block so the family revocation is committed
+        raise AuthenticationFailed('Refresh token already used.')
+    return record.user, create_access_token(record.user), refresh
+
+
+def revoke_refresh_token(token):
+    """Revoke the family of a refresh token on logout; invalid tokens are ignored."""
+    try:
+        payload = decode_refresh_token(token)
+    except AuthenticationFailed:
+        return
+    family = RefreshToken.objects.filter(jti=payload['jti']).values_list('family', flat=True).first()
+    if family:
+        RefreshToken.objects.filter(family=family, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+
+class UserCache:
+    """Size-bounded, short-lived cache of users keyed by (user_id, iat), evicting least recently used."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (user_id, iat) -> (expires_at, user)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + settings.JWT_USER_CACHE_TTL, user)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.JWT_USER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+class JWTAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates the access token from LoginView, sent as the `jwt` cookie or an
+    `Authorization: Bearer <token>` header. Requests without a token stay anonymous, and so do
+    requests whose cookie is expired or invalid; a bad Bearer token is rejected.
+    """
+
+    def authenticate(self, request):
+        token = self.get_bearer_token(request)
+        if token:
+            return self.authenticate_token(token)
+
+        token = request.COOKIES.get('jwt')
+        if not token:
+            return None
+        try:
+            return self.authenticate_token(token)
+        except AuthenticationFailed:
+            # A stale login cookie must not lock the browser out of public endpoints;
+            # views that require a user still answer 401 for the anonymous request
+            return None
+
+    def authenticate_token(self, token):
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'], options={'require': ['exp', 'iat']})
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationFailed('Token expired.')
+        except jwt.InvalidTokenError:
+            raise AuthenticationFailed('Invalid token.')
+        if payload.get('type') != 'access':
+            # Refresh tokens are only accepted by the token/refresh endpoint
+            raise AuthenticationFailed('Invalid token.')
+
+        key = (payload.get('id'), payload['iat'])
+        user = user_cache.get(key)
+        if user is None:
+            user = User.objects.filter(id=key[0]).first()
+            if user is None or not user.is_active:
+                raise AuthenticationFailed('User not found!')
+            user_cache.set(key, user)
+
+        return user, payload
+
+    def get_bearer_token(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != b'bearer':
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed('Invalid Authorization header.')
+        try:
+            return header[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid Authorization header.')
+
+    def authenticate_header(self, request):
+        return 'Bearer'
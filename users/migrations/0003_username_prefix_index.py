@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:20
+
+from django.db import migrations
+
+INDEX_NAME = 'users_user_username_prefix_idx'
+
+
+def create_prefix_index(apps, schema_editor):
+    """
+    Case-insensitive prefix index for `username__istartswith` searches. The index has to match
+    the SQL each backend generates, so it is created per vendor rather than declared on the model.
+    """
+    vendor = schema_editor.connection.vendor
+    table = schema_editor.quote_name(apps.get_model('users', 'User')._meta.db_table)
+    if vendor == 'postgresql':
+        # istartswith compiles to UPPER("username"::text) LIKE UPPER(%s)
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} (UPPER("username"::text) text_pattern_ops)')
+    elif vendor == 'sqlite':
+        # SQLite's LIKE is case-insensitive and can only use a NOCASE index
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} ("username" COLLATE NOCASE)')
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
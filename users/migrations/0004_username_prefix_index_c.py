@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:05
+
+from django.db import migrations
+
+INDEX_NAME = 'users_user_username_prefix_idx'
+
+
+def create_byte_order_index(apps, schema_editor):
+    """
+    Rebuild the prefix index in byte order over (UPPER(username), username) so UserListView's prefix
+    filter, `after` keyset and ordering, all written against ByteOrder(Upper('username')), use one index.
+    """
+    vendor = schema_editor.connection.vendor
+    table = schema_editor.quote_name(apps.get_model('users', 'User')._meta.db_table)
+    if vendor == 'postgresql':
+        # Byte order ("C") makes a prefix a contiguous range of the btree, matching ByteOrder's ordering
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} (UPPER("username") COLLATE "C", "username")')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} (UPPER("username") COLLATE BINARY, "username")')
+
+
+def restore_prefix_index(apps, schema_editor):
+    """Put back the index from 0003_username_prefix_index."""
+    vendor = schema_editor.connection.vendor
+    table = schema_editor.quote_name(apps.get_model('users', 'User')._meta.db_table)
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} (UPPER("username"::text) text_pattern_ops)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+        schema_editor.execute(f'CREATE INDEX {INDEX_NAME} ON {table} ("username" COLLATE NOCASE)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_username_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_byte_order_index, restore_prefix_index),
+    ]
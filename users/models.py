@@ -23,3 +23,19 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username}: {self.email}"
+
+
+class RefreshToken(models.Model):
+    """
+    Server-side record of an issued refresh token. Each refresh revokes the presented token
+    and issues a new one in the same family; presenting a revoked token revokes the family.
+    """
+    jti = models.CharField(max_length=32, unique=True)
+    family = models.CharField(max_length=32, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="refresh_tokens")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.jti}"
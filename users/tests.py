@@ -1,3 +1,103 @@
+import jwt
+from django.conf import settings
 from django.test import TestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework import status
+from .authentication import user_cache
+from .models import User
 
-# Create your tests here.
+
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username="Player1", email="player1@example.com", password="pass1234")
+
+    def login(self):
+        response = self.client.post(reverse("login"), {"email": "player1@example.com", "password": "pass1234"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["jwt"]
+
+    def test_user_view_accepts_cookie_or_bearer_token_and_caches_the_user(self):
+        """The login token authenticates via cookie or header; repeat requests skip the user query."""
+        token = self.login()
+
+        response = self.client.get(reverse("user"))  # Cookie set by login
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["username"], "Player1")
+
+        self.client.cookies.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user"), HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    def test_user_view_rejects_missing_or_forged_tokens(self):
+        response = self.client.get(reverse("user"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        forged = jwt.encode({"id": self.user.id, "exp": 9999999999, "iat": 1}, "secret", algorithm="HS256")
+        response = self.client.get(reverse("user"), HTTP_AUTHORIZATION=f"Bearer {forged}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_cookie_is_anonymous_but_a_stale_bearer_token_is_rejected(self):
+        """An expired login cookie still reads public endpoints; only protected views answer 401."""
+        expired = jwt.encode(
+            {"id": self.user.id, "type": "access", "exp": 1, "iat": 0}, settings.SECRET_KEY, algorithm="HS256"
+        )
+        self.client.cookies["jwt"] = expired
+
+        response = self.client.get(reverse("leaderboard"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("user"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.cookies["jwt"] = "not-a-token"
+        response = self.client.get(reverse("leaderboard"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.cookies.clear()
+        response = self.client.get(reverse("leaderboard"), HTTP_AUTHORIZATION=f"Bearer {expired}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_tokens_and_reuse_revokes_the_family(self):
+        """A refresh token works once; replaying it also invalidates the token it was rotated into."""
+        login = self.client.post(reverse("login"), {"email": "player1@example.com", "password": "pass1234"})
+        first_refresh = login.data["refresh"]
+        self.client.cookies.clear()
+
+        response = self.client.post(reverse("token-refresh"), {"refresh": first_refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second_refresh = response.data["refresh"]
+        response = self.client.get(reverse("user"), HTTP_AUTHORIZATION=f"Bearer {response.data['jwt']}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Refresh tokens are not accepted as access tokens
+        response = self.client.get(reverse("user"), HTTP_AUTHORIZATION=f"Bearer {second_refresh}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.cookies.clear()
+        response = self.client.post(reverse("token-refresh"), {"refresh": first_refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse("token-refresh"), {"refresh": second_refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        for name in ["alice", "Alfred", "ALBERT", "bob", "Alvin"]:
+            User.objects.create(username=name, email=f"{name.lower()}@example.com")
+
+    def test_prefix_search_is_case_insensitive_paginated_and_cacheable(self):
+        response = self.client.get(reverse("users"), {"q": "al", "limit": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user["username"] for user in response.data], ["ALBERT", "Alfred"])
+
+        response = self.client.get(reverse("users"), {"q": "al", "limit": 2, "after": "Alfred"})
+        self.assertEqual([user["username"] for user in response.data], ["alice", "Alvin"])
+
+        response = self.client.get(
+            reverse("users"), {"q": "al", "limit": 2, "after": "Alfred"}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
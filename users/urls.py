@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import RegisterView, LoginView, UserView, LogoutView, UserListView
+from .views import RegisterView, LoginView, UserView, LogoutView, UserListView, TokenRefreshView
 
 urlpatterns = [
     path('register', RegisterView.as_view(), name='register'),
     path('login', LoginView.as_view(), name='login'),
     path('user', UserView.as_view(), name='user'),
+    path('token/refresh', TokenRefreshView.as_view(), name='token-refresh'),
     path('logout', LogoutView.as_view(), name='logout'),
     path('users', UserListView.as_view(), name='users'),
 ]
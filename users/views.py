@@ -1,19 +1,52 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import status
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from .authentication import create_access_token, create_refresh_token, rotate_refresh_token, revoke_refresh_token
 from .serializers import UserSerializer
 from .models import User
-import jwt, datetime
+from django.db.models import Q
+from django.db.models.functions import Collate, Upper
+from django.utils.http import parse_etags, quote_etag
+import hashlib, json
+
+def token_response(message, access, refresh):
+    """Return both tokens in the body and as httponly cookies."""
+    response = Response()
+    for key, value in (('jwt', access), ('refresh', refresh)):
+        response.set_cookie(
+            key=key,
+            value=value,
+            httponly=True,
+            secure=True,
+            samesite='None'
+        )
+    response.data = {
+        'message': message,
+        'jwt': access,
+        'refresh': refresh
+    }
+    return response
+
+class TokenView(APIView):
+    """Issues or revokes tokens, so a stale cookie must not block it; failures are still 401s."""
+    authentication_classes = []
+
+    def get_authenticate_header(self, request):
+        return 'Bearer'
 
 # Create your views here.
 class RegisterView(APIView):
+    authentication_classes = []
+
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
     
-class LoginView(APIView):
+class LoginView(TokenView):
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
@@ -32,59 +65,87 @@ class LoginView(APIView):
         if not user.check_password(password):
             raise AuthenticationFailed('Incorrect password.')
 
-        payload = {
-            'id': user.id,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=60),
-            'iat': datetime.datetime.utcnow()
-        }
-        token = jwt.encode(payload, 'secret', algorithm='HS256')
-        response = Response()
-        response.set_cookie(
-            key='jwt',
-            value=token,
-            httponly=True,
-            secure=True,
-            samesite='None'
-        )
-        response.data = {
-            'message': 'Login successful',
-            'jwt': token
-        }
+        return token_response('Login successful', create_access_token(user), create_refresh_token(user))
 
-        return response
+class TokenRefreshView(TokenView):
+    # Trades a refresh token for new tokens with a signature check and one row lock, no password hashing
+    def post(self, request):
+        token = request.data.get('refresh') or request.COOKIES.get('refresh')
+
+        if not token:
+            raise AuthenticationFailed('Refresh token is required.')
+
+        _, access, refresh = rotate_refresh_token(token)
+        return token_response('Token refreshed', access, refresh)
 
 class UserView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
-        token = request.COOKIES.get('jwt')
-        
-        if not token:
-            raise AuthenticationFailed('Unauthenticated!')
-        
-        try:
-            payload = jwt.decode(token, 'secret', algorithms=['HS256'])
-        except jwt.ExpiredSignatureError:
-            raise AuthenticationFailed('Unauthenticated!')
-        
-        user = User.objects.filter(id=payload['id']).first()
-        if not user:
-            raise AuthenticationFailed('User not found!')
-        
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(request.user)
         
         return Response(serializer.data)
 
-class LogoutView(APIView):
+class LogoutView(TokenView):
     def post(self, request):
+        token = request.data.get('refresh') or request.COOKIES.get('refresh')
+        if token:
+            revoke_refresh_token(token)
+
         response = Response()
         response.delete_cookie('jwt')
+        response.delete_cookie('refresh')
         response.data = {
             'message': 'success'
         }
         
         return response
     
+class ByteOrder(Collate):
+    """Compare and sort in byte order, the collation of the username prefix index."""
+
+    def __init__(self, expression):
+        super().__init__(expression, 'C')
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite has no "C" collation; its byte-order collation is BINARY
+        return self.as_sql(compiler, connection, collation='BINARY', **extra_context)
+
 class UserListView(APIView):
+    """Player picker search: case-insensitive username prefix, one keyset page at a time."""
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
     def get(self, request):
-        users = User.objects.all().values('id', 'username')
+        params = request.query_params
+        query = params.get('q', '')
+        after = params.get('after')
+        try:
+            limit = min(int(params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if limit < 1:
+            return Response({'error': 'limit must be positive.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Filter, keyset and ordering all read the byte-ordered index from 0004_username_prefix_index_c
+        users = User.objects.annotate(name_key=ByteOrder(Upper('username')))
+        if query:
+            # A byte-order range rather than LIKE, so SQLite seeks the index too
+            prefix = query.upper()
+            users = users.filter(name_key__gte=prefix, name_key__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+        # Resume after the last username the client saw
+        if after is not None:
+            users = users.filter(
+                Q(name_key__gt=after.upper()) | Q(name_key=after.upper(), username__gt=after)
+            )
+
+        users = users.order_by('name_key', 'username').values('id', 'username')[:limit]
         user_list = [{'user_id': user['id'], 'username': user['username']} for user in users]
-        return Response(user_list)
\ No newline at end of file
+
+        etag = quote_etag(hashlib.sha1(json.dumps(user_list).encode()).hexdigest())
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in parse_etags(if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(user_list, headers={'ETag': etag})